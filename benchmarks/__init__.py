@@ -0,0 +1,5 @@
+"""
+parselcli performance benchmarks: parsing, selecting, processing and completing against synthetic documents
+
+run with `python -m benchmarks --help`
+"""
@@ -0,0 +1,88 @@
+"""
+benchmark runner command line interface
+
+    # run default sizes and save results
+    python -m benchmarks -o results.json
+    # run only select benchmarks of 1MB document and compare them with saved baseline
+    python -m benchmarks --sizes 1MB -k select --baseline results.json
+"""
+import json
+import sys
+from functools import partial
+from pathlib import Path
+
+import click
+from click import echo
+from loguru import logger as log
+
+from benchmarks.corpus import DEFAULT_SIZES, SIZES, corpus
+from benchmarks.suite import compare, run
+from parselcli.timings import format_duration as format_time
+
+echo = partial(echo, err=True)
+CORPUS_DIR = Path(__file__).parent / ".corpora"
+
+
+@click.command()
+@click.option(
+    "--sizes",
+    default=",".join(DEFAULT_SIZES),
+    show_default=True,
+    help=f"comma separated corpus sizes, e.g. 10KB,250KB,2MB or 'all' for {','.join(SIZES)}",
+)
+@click.option("-k", "match", help="only run benchmarks which name contains this text")
+@click.option("--repeat", default=5, show_default=True, help="timed runs of every benchmark")
+@click.option("--min-time", default=0.2, show_default=True, help="minimum seconds a single timed run takes")
+@click.option("-o", "--output", type=click.Path(dir_okay=False, writable=True), help="write json results to file")
+@click.option("--baseline", type=click.Path(exists=True, dir_okay=False), help="json results to compare against")
+@click.option(
+    "--threshold",
+    default=1.25,
+    show_default=True,
+    help="fail when benchmark is slower than baseline by more than this ratio",
+)
+@click.option(
+    "--corpus-dir",
+    type=click.Path(file_okay=False),
+    default=str(CORPUS_DIR),
+    show_default=True,
+    help="directory generated corpora are cached in",
+)
+def main(sizes, match, repeat, min_time, output, baseline, threshold, corpus_dir):
+    """Benchmark parsing, selecting, processing and completion against synthetic html documents."""
+    log.remove()
+    names = list(SIZES) if sizes == "all" else [size.strip() for size in sizes.split(",") if size.strip()]
+    corpora = {}
+    for name in names:
+        echo(f"preparing {name} corpus")
+        try:
+            corpora[name] = corpus(name, corpus_dir)
+        except ValueError as exc:
+            raise click.BadParameter(str(exc), param_hint="--sizes")
+
+    def report(name, result):
+        echo(f"{format_time(result['min']):>10} {format_time(result['median']):>10}  {name}")
+
+    echo(f"{'min':>10} {'median':>10}")
+    results = run(corpora, match=match, repeat=repeat, min_time=min_time, report=report)
+    if output:
+        Path(output).write_text(json.dumps(results, indent=2))
+    else:
+        click.echo(json.dumps(results, indent=2))
+
+    if baseline:
+        rows, regressions = compare(results, json.loads(Path(baseline).read_text()), threshold=threshold)
+        echo(f"\n{'baseline':>10} {'current':>10} {'ratio':>6}")
+        for row in rows:
+            mark = " !" if row["name"] in regressions else ""
+            echo(
+                f"{format_time(row['baseline']):>10} {format_time(row['current']):>10} "
+                f"{row['ratio']:>6.2f}  {row['name']}{mark}"
+            )
+        if regressions:
+            echo(f"{len(regressions)} benchmarks are slower than baseline by more than {threshold}x")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=E1120
@@ -0,0 +1,91 @@
+"""
+contains synthetic html corpora generation
+documents are generated from a seeded random generator so every run benchmarks identical documents
+"""
+import random
+import re
+from pathlib import Path
+from typing import Dict, List
+
+SIZES: Dict[str, int] = {
+    "10KB": 10 * 1024,
+    "100KB": 100 * 1024,
+    "1MB": 1024 * 1024,
+    "10MB": 10 * 1024 * 1024,
+    "100MB": 100 * 1024 * 1024,
+}
+DEFAULT_SIZES = ["10KB", "100KB", "1MB", "10MB"]
+# bump when generated documents change so cached corpora are regenerated
+VERSION = 1
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore et dolore "
+    "magna aliqua enim ad minim veniam quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo"
+).split()
+TAGS = ["new", "sale", "popular", "limited", "eco", "imported", "refurbished", "bundle"]
+
+
+def parse_size(size: str) -> int:
+    """
+    parse human readable size to bytes
+
+    >>> parse_size("10KB"), parse_size("1mb"), parse_size("512")
+    (10240, 1048576, 512)
+    """
+    match = re.fullmatch(r"(\d+)\s*([kmg]?)b?", size.strip().lower())
+    if not match:
+        raise ValueError(f"invalid size: {size}")
+    number, unit = match.groups()
+    return int(number) * 1024 ** " kmg".index(unit or " ")
+
+
+def _sentence(rng: random.Random, length: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def _product(rng: random.Random, i: int) -> str:
+    tags = "".join(f'<li><span class="tag tag-{tag}">{tag}</span></li>' for tag in rng.sample(TAGS, rng.randint(1, 4)))
+    price = f"{rng.randint(1, 999)}.{rng.randint(0, 99):02}"
+    return (
+        f'<div class="product cls-{rng.randrange(500)}" id="product-{i}" data-price="{price}">\n'
+        f'  <h2 class="title"><a href="/product/{i}?ref=list&amp;page={i // 50}"> {_sentence(rng, 3)} </a></h2>\n'
+        f'  <p class="description">{_sentence(rng, rng.randint(8, 30))}<br>{_sentence(rng, 5)}</p>\n'
+        f'  <ul class="tags">{tags}</ul>\n'
+        f'  <table class="specs"><tr><th>weight</th><td>{rng.randint(1, 100)} kg</td></tr>'
+        f"<tr><th>color</th><td>{rng.choice(WORDS)}</td></tr></table>\n"
+        f'  <span class="price"> ${price} </span>\n'
+        "</div>\n"
+    )
+
+
+def generate_html(size: int, seed: int = 0) -> bytes:
+    """generate product listing html document of roughly `size` bytes"""
+    rng = random.Random(seed)
+    head = (
+        "<!DOCTYPE html>\n<html><head><title>benchmark products</title>"
+        '<meta charset="utf-8"><link rel="stylesheet" href="/static/style.css"></head>\n'
+        '<body><div id="main" class="container">\n'
+    )
+    tail = '</div><script>window.products = {"loaded": true};</script></body></html>\n'
+    parts: List[str] = [head]
+    total = len(head) + len(tail)
+    i = 0
+    while total < size:
+        part = _product(rng, i)
+        parts.append(part)
+        total += len(part)
+        i += 1
+    parts.append(tail)
+    return "".join(parts).encode("utf-8")
+
+
+def corpus(name: str, directory: Path) -> Path:
+    """return path to corpus file of given size name, generating it if it's not cached in directory yet"""
+    size = SIZES[name] if name in SIZES else parse_size(name)
+    path = Path(directory) / f"products-{name}-v{VERSION}.html"
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(generate_html(size))
+        tmp.replace(path)
+    return path
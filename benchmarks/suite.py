@@ -0,0 +1,214 @@
+"""
+contains benchmark cases and timing, reporting and baseline comparison functionality
+"""
+import gc
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import lxml.etree
+import parsel
+from prompt_toolkit.completion import CompleteEvent
+from prompt_toolkit.document import Document
+
+from parselcli.processors import (
+    AbsoluteUrl,
+    Collapse,
+    First,
+    FormatHtml,
+    Join,
+    Len,
+    Nth,
+    Regex,
+    Repr,
+    Slice,
+    Strip,
+    Sum,
+    Unique,
+)
+from parselcli.prompt.completer import MiddleWordCompleter
+from parselcli.prompt.runner import Prompter
+from parselcli.prompt.utils import find_vocabulary, get_css_completion, get_xpath_completion
+from parselcli.render.file import FileRenderer
+
+QUERIES = {
+    "css": ["a::attr(href)", "div.product h2 a::text", ".tags .tag::text", "#main > div[data-price]"],
+    "xpath": ["//a/@href", "//div[@class and contains(@class, 'product')]//h2/a/text()", "//td[1]/text()"],
+}
+COMPLETION_INPUTS = ["div", ".cls-4", "product", "#product-99", "tag-s"]
+# amount of html values --pretty is benchmarked on as formatting whole big corpus would take minutes
+PRETTY_VALUES = 200
+
+Benchmark = Tuple[str, Callable[[], Any]]
+
+
+def measure(func: Callable[[], Any], repeat: int = 5, min_time: float = 0.2) -> Dict[str, Any]:
+    """
+    time func the way timeit does: calls are looped until a single run takes at least `min_time`
+    and the run is repeated `repeat` times; garbage collection is disabled while timing
+    returns seconds per call statistics
+    """
+
+    def run(loops: int) -> float:
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            for _ in range(loops):
+                func()
+            return time.perf_counter() - start
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    loops = 1
+    elapsed = run(loops)
+    while elapsed < min_time:
+        loops = max(loops * 2, int(loops * min_time / max(elapsed, 1e-9) * 1.1))
+        elapsed = run(loops)
+    times = [elapsed / loops] + [run(loops) / loops for _ in range(repeat - 1)]
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "loops": loops,
+        "repeat": repeat,
+    }
+
+
+def _select(prompter: Prompter, mode: str, query: str, processors=None):
+    prompter.mode = mode
+    return prompter.select(query, processors=processors or [])
+
+
+def _complete(completer: MiddleWordCompleter, text: str):
+    return list(completer.get_completions(Document(text), CompleteEvent()))
+
+
+def benchmarks(path: Path) -> Iterator[Benchmark]:
+    """generate (name, function) benchmark cases for document at path"""
+    renderer = FileRenderer()
+    renderer.open()
+    renderer.goto(str(path))
+
+    def parse():
+        renderer.invalidate()
+        return renderer.selector
+
+    yield "parse", parse
+
+    sel = renderer.selector
+    response = renderer.response
+    prompter = Prompter(renderer)
+    for mode, queries in QUERIES.items():
+        for query in queries:
+            yield f"select.{mode} {query}", partial(_select, prompter, mode, query)
+    yield "select.css a::attr(href) --strip --absolute --unique", partial(
+        _select, prompter, "css", "a::attr(href)", [Strip(), AbsoluteUrl(), Unique()]
+    )
+    yield "select.css div.product --len", partial(_select, prompter, "css", "div.product", [Len()])
+    yield "select.css div.product --first", partial(_select, prompter, "css", "div.product", [First()])
+
+    texts = sel.css("h2 a::text").getall()
+    hrefs = sel.css("a::attr(href)").getall()
+    prices = sel.css("div::attr(data-price)").getall()
+    html = sel.css("div.product")[:PRETTY_VALUES].getall()
+    processors = [
+        ("strip", Strip(), texts),
+        ("collapse", Collapse(), texts),
+        ("absolute", AbsoluteUrl(), hrefs),
+        ("join", Join(","), texts),
+        ("first", First(), texts),
+        ("n", Nth(3), texts),
+        ("len", Len(), texts),
+        ("pretty", FormatHtml(), html),
+        ("repr", Repr(), texts),
+        ("re", Regex(r"product/(\d+)"), hrefs),
+        ("slice", Slice("10:-10"), texts),
+        ("sum", Sum(), prices),
+        ("unique", Unique(), hrefs),
+    ]
+    for name, processor, values in processors:
+        yield f"process.{name}", partial(processor, values, response=response)
+
+    yield "complete.vocabulary", partial(find_vocabulary, sel)
+    vocabulary = find_vocabulary(sel)
+    yield "complete.css_items", partial(get_css_completion, vocabulary)
+    for mode, get_completion, counts in [
+        ("css", get_css_completion, vocabulary.css()),
+        ("xpath", get_xpath_completion, vocabulary.xpath()),
+    ]:
+        completer = MiddleWordCompleter(get_completion(vocabulary), frequencies=counts)
+        yield f"complete.{mode}_index", completer.build_index
+        for text in COMPLETION_INPUTS if mode == "css" else ["div", "prod", "@cl"]:
+            yield f"complete.{mode} {text}", partial(_complete, completer, text)
+    renderer.close()
+
+
+def run(
+    sizes: Dict[str, Path],
+    match: Optional[str] = None,
+    repeat: int = 5,
+    min_time: float = 0.2,
+    report: Callable[[str, Dict], None] = lambda name, result: None,
+) -> Dict[str, Any]:
+    """run benchmarks against every corpus in sizes which name contains `match`"""
+    results = {}
+    for size, path in sizes.items():
+        for name, func in benchmarks(path):
+            key = f"{name} [{size}]"
+            if match and match not in key:
+                continue
+            func()  # warm up caches, e.g. compiled selectors and completion indexes
+            results[key] = measure(func, repeat=repeat, min_time=min_time)
+            report(key, results[key])
+    return {"meta": metadata(), "results": results}
+
+
+def metadata() -> Dict[str, Any]:
+    """environment the benchmarks ran in"""
+    try:
+        from importlib import metadata as importlib_metadata  # pylint: disable=C0415
+    except ImportError:  # python 3.7
+        import pkg_resources  # pylint: disable=C0415
+
+        try:
+            version = pkg_resources.get_distribution("parselcli").version
+        except pkg_resources.DistributionNotFound:
+            version = None
+    else:
+        try:
+            version = importlib_metadata.version("parselcli")
+        except importlib_metadata.PackageNotFoundError:
+            version = None
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "parselcli": version,
+        "parsel": parsel.__version__,
+        "lxml": ".".join(map(str, lxml.etree.LXML_VERSION)),
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float = 1.25) -> Tuple[List[Dict], List[str]]:
+    """
+    compare minimum times of results with baseline
+    returns comparison rows and names of benchmarks that are slower than baseline by more than threshold ratio
+    """
+    rows, regressions = [], []
+    for name, result in results["results"].items():
+        base = baseline["results"].get(name)
+        if not base:
+            continue
+        ratio = result["min"] / base["min"]
+        rows.append({"name": name, "baseline": base["min"], "current": result["min"], "ratio": ratio})
+        if ratio > threshold:
+            regressions.append(name)
+    return rows, regressions
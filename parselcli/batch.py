@@ -0,0 +1,268 @@
+"""
+Contains non-interactive batch functionality:
+evaluating named selectors against many urls or files and producing results as json lines.
+"""
+import gzip
+import json
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from copy import deepcopy
+from functools import partial
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, List, NamedTuple, Tuple
+from urllib.parse import urlparse
+
+import toml
+from click import UsageError
+from loguru import logger as log
+from lxml import etree
+from parsel import Selector
+from requests import Response
+
+from parselcli.processors import Pipeline, Processor
+from parselcli.prompt import Prompter
+from parselcli.render.file import (
+    document_files,
+    document_type,
+    local_path,
+    map_file,
+    parse_document,
+    sniff_encoding,
+)
+from parselcli.render.http import FetchPool
+from parselcli.render.memory import create_response
+from parselcli.selectors import evaluate as evaluate_query, extract
+from parselcli.utils import chunked, ordered_imap
+
+
+class SelectorSpec(NamedTuple):
+    """named selector with its processor chain"""
+
+    name: str
+    query: str
+    mode: str
+    processors: List[Processor]
+    pipeline: Pipeline
+
+
+# selector specs of current worker process, set once by pool initializer
+_worker_specs: List[SelectorSpec] = []
+
+
+def parse_selector(name: str, text: str, mode: str = "css") -> SelectorSpec:
+    """
+    Parse selector spec from prompt style input, e.g. "h1::text --first --strip"
+    --css and --xpath flags switch selector mode
+    """
+    try:
+        opts, query = Prompter.parse_input(text)
+    except Exception as exc:  # pylint: disable=W0703
+        raise UsageError(f'selector "{name}": {exc}') from exc
+    processors = []
+    for opt, value in opts.items():
+        if opt in ("css", "xpath"):
+            mode = opt
+        elif opt in Prompter.processors:
+            processors.append(Prompter.create_processor(opt, value))
+        else:
+            raise UsageError(f'selector "{name}": command --{opt} is not supported in batch mode')
+    if not query:
+        raise UsageError(f'selector "{name}": missing css or xpath expression')
+    return SelectorSpec(name, query.strip("'"), mode, processors, Pipeline(processors))
+
+
+def load_spec(path: Path) -> List[SelectorSpec]:
+    """
+    Load selector specs from toml or json file. File is either a table of selectors or has them under
+    "selectors" key together with default "mode", e.g.:
+
+        mode = "css"
+        [selectors]
+        title = "h1::text --first --strip"
+        links = "//a/@href --xpath --absolute"
+    """
+    text = path.read_text()
+    data = json.loads(text) if path.suffix == ".json" else toml.loads(text)
+    mode = "css"
+    if isinstance(data.get("selectors"), dict):
+        mode = data.get("mode", mode)
+        data = data["selectors"]
+    return [parse_selector(name, text, mode=mode) for name, text in data.items()]
+
+
+def read_inputs(lines: Iterable[str]) -> Iterator[str]:
+    """
+    read urls or file paths from lines, ignoring empty ones and # comments
+    directories are expanded to html and xml documents they contain
+    """
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        path = local_path(line)
+        if path and path.is_dir():
+            yield from (str(file) for file in document_files(path))
+        else:
+            yield line
+
+
+def evaluate(
+    selector: Selector, specs: List[SelectorSpec], response: Response = None
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    evaluate selector specs against a document
+    returns data and errors of failed selectors by selector name
+    """
+    data, errors = {}, {}
+    extract_result = partial(extract, type=selector.type)
+    for spec in specs:
+        try:
+            results = evaluate_query(selector, spec.query, mode=spec.mode)
+            data[spec.name], _ = spec.pipeline.process_results(results, extract_result, response=response)
+        except Exception as exc:  # pylint: disable=W0703
+            log.debug(f'selector "{spec.name}" failed: {exc}')
+            data[spec.name] = None
+            errors[spec.name] = f"{type(exc).__name__}: {exc}"
+    return data, errors
+
+
+def retrieve(source: str, pool: FetchPool) -> Response:
+    """read local file or fetch url with one of pool's sessions"""
+    path = local_path(source)
+    if path:
+        body = map_file(path)
+        return create_response(path.absolute().as_uri(), body, encoding=sniff_encoding(body))
+    return pool.fetch(source)
+
+
+def process_response(source: str, response: Response, specs: List[SelectorSpec]) -> Dict:
+    """evaluate specs against retrieved source and create result dictionary"""
+    try:
+        selector = parse_document(
+            response.content, type=document_type(response.url), encoding=response.encoding or "utf-8"
+        )
+        data, errors = evaluate(selector, specs, response=response)
+    except Exception as exc:  # pylint: disable=W0703
+        log.error(f"failed to process {source}: {exc}")
+        return {"url": source, "error": f"{type(exc).__name__}: {exc}"}
+    result = {"url": source, "status": response.status_code, "data": data}
+    if errors:
+        result["errors"] = errors
+    return result
+
+
+def _init_worker(specs: List[SelectorSpec]):
+    global _worker_specs  # pylint: disable=W0603
+    _worker_specs = specs
+
+
+def _process_chunk(chunk: List[Tuple[str, Any]]) -> List[Dict]:
+    """process chunk of (source, packed response or error) items in worker process"""
+    results = []
+    for source, packed in chunk:
+        if isinstance(packed, dict):  # retrieval error
+            results.append(packed)
+            continue
+        results.append(process_response(source, create_response(*packed), _worker_specs))
+    return results
+
+
+def _pack(source: str, future: Future) -> Tuple[str, Any]:
+    """pack retrieved response to only what workers need to evaluate it"""
+    try:
+        response = future.result()
+    except Exception as exc:  # pylint: disable=W0703
+        log.error(f"failed to retrieve {source}: {exc}")
+        return source, {"url": source, "error": f"{type(exc).__name__}: {exc}"}
+    return source, (response.url, response.content[:], response.status_code, response.encoding)
+
+
+def run_batch(
+    specs: List[SelectorSpec], sources: Iterable[str], pool: FetchPool, workers: int = 1, chunk_size: int = 16
+) -> Iterator[Dict]:
+    """
+    evaluate specs against every source: either a url or a local file
+    sources are retrieved concurrently through the pool while retrieved ones are being evaluated
+    either in current process or, when workers > 1, in chunks by a pool of worker processes
+    yields result dictionary for every source in same order as sources
+    """
+    retrieved = pool.imap(sources, lambda source: retrieve(source, pool))
+    if workers <= 1:
+        for source, future in retrieved:
+            log.info(f"processing {source}")
+            try:
+                response = future.result()
+            except Exception as exc:  # pylint: disable=W0703
+                log.error(f"failed to retrieve {source}: {exc}")
+                yield {"url": source, "error": f"{type(exc).__name__}: {exc}"}
+                continue
+            yield process_response(source, response, specs)
+        return
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(specs,)) as executor:
+        chunks = chunked((_pack(source, future) for source, future in retrieved), chunk_size)
+        for _, future in ordered_imap(lambda chunk: executor.submit(_process_chunk, chunk), chunks, window=workers * 2):
+            yield from future.result()
+
+
+def iter_records(stream: IO[bytes], tag: str, type: str = "xml") -> Iterator[Selector]:  # pylint: disable=W0622
+    """
+    parse document stream incrementally and yield selector of every `tag` element;
+    elements are freed once their selector is yielded so memory stays bounded regardless of document size.
+    Record selectors are detached from the document and have namespaces removed.
+    """
+    if not tag.startswith("{"):
+        tag = "{*}" + tag  # match tag in any namespace
+    for _, element in etree.iterparse(
+        stream, events=("end",), tag=tag, html=type == "html", recover=True, huge_tree=True
+    ):
+        sel = Selector(root=deepcopy(element), type=type)
+        sel.remove_namespaces()
+        yield sel
+        element.clear(keep_tail=True)
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+
+
+@contextmanager
+def open_stream(source: str, pool: FetchPool) -> Iterator[IO[bytes]]:
+    """
+    open local file or url as byte stream; files and urls ending with .gz are decompressed
+    urls count towards pool's host limit until the stream is closed
+    """
+    path = local_path(source)
+    if path:
+        with gzip.open(path) if path.suffix == ".gz" else open(path, "rb") as stream:
+            yield stream
+        return
+    with pool.host_limit(source), pool.session.get(source, stream=True) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        if urlparse(source).path.endswith(".gz"):
+            with gzip.GzipFile(fileobj=response.raw) as stream:
+                yield stream
+        else:
+            yield response.raw
+
+
+def run_records(specs: List[SelectorSpec], sources: Iterable[str], pool: FetchPool, tag: str) -> Iterator[Dict]:
+    """
+    evaluate specs against every `tag` element of every source separately, streaming sources rather than
+    loading them to memory. Yields result dictionary for every record
+    """
+    for source in sources:
+        log.info(f"streaming {source} records of <{tag}>")
+        doc_type = document_type(source[:-3] if source.endswith(".gz") else source)
+        # records are never read whole so processors (e.g. --absolute) only get url of their source
+        path = local_path(source)
+        response = create_response(path.absolute().as_uri() if path else source, b"")
+        try:
+            with open_stream(source, pool) as stream:
+                for i, sel in enumerate(iter_records(stream, tag, type=doc_type)):
+                    data, errors = evaluate(sel, specs, response=response)
+                    result = {"url": source, "record": i, "data": data}
+                    if errors:
+                        result["errors"] = errors
+                    yield result
+        except Exception as exc:  # pylint: disable=W0703
+            log.error(f"failed to process {source}: {exc}")
+            yield {"url": source, "error": f"{type(exc).__name__}: {exc}"}
@@ -1,9 +1,12 @@
 """
 Contains command line interface functionality.
 This is the entrypoint for parselcli cli app.
+Heavy dependencies are imported by commands that need them so one-shot runs start fast.
 """
-# pylint: disable=E1120,R0914
+# pylint: disable=E1120,R0914,C0415
 from functools import partial
+import json
+import os
 import sys
 from pathlib import Path
 
@@ -13,11 +16,10 @@ from loguru import logger as log
 
 from parselcli.config import CONFIG, get_config
 from parselcli.embed import PYTHON_SHELLS
-from parselcli.prompt import Prompter
-from parselcli.render.browser import PlaywrightRenderer
-from parselcli.render.http import HttpRenderer, CachedHttpRenderer
 
 CACHE_EXPIRY = 60 * 60  # 1 hour
+# device prompt input is read from when document was read from stdin
+TERMINAL = "CON" if os.name == "nt" else "/dev/tty"
 
 echo = partial(echo, err=True)
 
@@ -34,7 +36,36 @@ def setup_logging(verbosity: int = 0):
     )
 
 
-@click.command()
+class DefaultGroup(click.Group):
+    """Command group that runs default command when no sub command is given, e.g. `parsel URL`"""
+
+    def __init__(self, *args, default: str, **kwargs):
+        self.default = default
+        super().__init__(*args, **kwargs)
+
+    def parse_args(self, ctx, args):
+        if not args or args[0] not in self.commands:
+            args.insert(0, self.default)
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=DefaultGroup, default="shell")
+def cli():
+    """CLI interpreter for xpath/css selectors"""
+
+
+def get_headers(config, headers):
+    """merge headers from config and cli "key=value" options"""
+    headers = dict([h.split("=", 1) for h in headers])
+    req_config = {k: v for k, v in config["requests"].items() if k in ["headers"]}
+    log.debug(f"inferred headers from config: {req_config['headers']}")
+    log.debug(f"inferred headers from cli: {headers}")
+    headers = {**req_config["headers"], **headers}
+    log.debug(f"using headers: {headers}")
+    return headers
+
+
+@cli.command(epilog="See `parsel batch --help` for running selectors against many urls or files.")
 @click.argument("url")
 @click.option("-h", "headers", help='request headers, e.g. -h "user-agent=cat bot"', multiple=True)
 @click.option("--xpath", is_flag=True, help="start in xpath mode instead of css")
@@ -54,6 +85,11 @@ def setup_logging(verbosity: int = 0):
     "--browser-wait-xpath",
     help="wait for browser page to render until xpath selector appears",
 )
+@click.option(
+    "--browser-in-page",
+    is_flag=True,
+    help="evaluate selectors inside the browser page instead of parsing page's html",
+)
 @click.option("-c", "compile_css", help="compile css and return it")
 @click.option("-x", "compile_xpath", help="compile xpath and return it")
 @click.option("-i", "initial_input", help="initial input", multiple=True)
@@ -68,7 +104,7 @@ def setup_logging(verbosity: int = 0):
     type=click.Choice(list(PYTHON_SHELLS.keys())),
     help="preferred embedded shell; default auto resolve in order",
 )
-def cli(
+def shell(
     url,
     xpath,
     initial_input,
@@ -87,34 +123,53 @@ def cli(
     browser_wait,
     browser_wait_css,
     browser_wait_xpath,
+    browser_in_page,
 ):
-    """Interactive shell for css and xpath selectors"""
+    """
+    Interactive shell for css and xpath selectors
+
+    URL can be a http url, local file, directory of documents or "-" for reading document from stdin.
+    """
+    from parselcli.prompt import Prompter
+    from parselcli.render.file import FileRenderer, local_path
+
     setup_logging(verbosity)
-    echo(f"using cached version for: {url}" if cache else f"requesting: {url}")
+    local = url == "-" or local_path(url) is not None
+    if local:
+        echo(f"reading: {url}")
+    else:
+        echo(f"using cached version for: {url}" if cache else f"requesting: {url}")
     log.debug(f"using config from {config}")
-    headers = dict([h.split("=", 1) for h in headers])
     config = get_config(Path(config))
     log.debug(f"config values: {config}")
 
     # Create prompter either from url or file
-    req_config = {k: v for k, v in config["requests"].items() if k in ["headers"]}
-    log.debug(f"inferred headers from config: {req_config['headers']}")
-    log.debug(f"inferred headers from cli: {headers}")
-    headers = {**req_config["headers"], **headers}
-    log.debug(f"using headers: {headers}")
+    headers = get_headers(config, headers)
 
     # Establish renderer
     if browser or browser_headless:
+        from parselcli.render.browser import PlaywrightRenderer
+
         renderer_cls = PlaywrightRenderer
+        if local and url != "-":
+            url = local_path(url).absolute().as_uri()
+    elif local:
+        renderer_cls = FileRenderer
     elif cache:
+        from parselcli.render.http import CachedHttpRenderer
+
         renderer_cls = CachedHttpRenderer
     else:
+        from parselcli.render.http import HttpRenderer
+
         renderer_cls = HttpRenderer
     renderer = renderer_cls(
         headers=headers,
-        cache_file=config["requests"]["cache_file"],
+        cache_dir=config["requests"]["cache_dir"],
+        cache_size=config["requests"]["cache_size"],
         cache_expire=config["requests"]["cache_expire"] if cache else -1,
         browser_kwargs={"headless": bool(browser_headless)},
+        evaluate_in_page=browser_in_page,
     )
     renderer.open()
     renderer.goto(url)
@@ -137,28 +192,204 @@ def cli(
         color=not (not config["color"] or no_color),
         vi_mode=vi_mode or config["vi_mode"],
         preferred_embed=shell,
+        warn_limit=config["warn_limit"],
+        output_history_size=config["output_history_size"],
+        output_history_bytes=config["output_history_bytes"],
+        output_history_disk_bytes=config["output_history_disk_bytes"],
+        max_tabs=config["max_tabs"],
     )
     prompter = Prompter(renderer=renderer, **prompter_kwargs)
+    files = getattr(renderer, "files", [])
+    if len(files) > 1:
+        echo(f"found {len(files)} documents, opened {files[0]}")
+        if not (compile_css or compile_xpath):
+            tabs = prompter.prefetch(str(path) for path in files[1:])
+            echo(f"loading {len(tabs)} more in tabs; see --tabs and --tab")
 
     if not initial_input:
         initial_input = config.get("initial_input", [])
     if initial_input:
         for line in initial_input:
             prompter.readline(line)
+            # documents fetched by initial input are used by the following lines
+            prompter.wait_for_fetch()
     if compile_css:
         log.debug(f'compiling css "{compile_css}" and exiting')
-        prompter.console.print(prompter.readline(compile_css + " --css")[0])
+        prompter.print_result(prompter.readline(compile_css + " --css")[0], plain=True)
         return
     if compile_xpath:
         log.debug(f'compiling xpath "{compile_xpath}" and exiting')
-        prompter.console.print(prompter._get_xpath(compile_xpath)[0])
+        prompter.print_result(prompter._get_xpath(compile_xpath)[0], plain=True)
         return
     log.debug("starting prompt loop")
+    stdin = sys.stdin
+    if url == "-":
+        # document was read from stdin so input prompt has to be read from terminal
+        sys.stdin = open(TERMINAL, encoding="utf-8")  # pylint: disable=R1732
     try:
         prompter.loop_prompt(start_in_embed=embed)
     except Exception as e:
         prompter.renderer.close()
         raise e
+    finally:
+        prompter.close()
+        if sys.stdin is not stdin:
+            sys.stdin.close()
+            sys.stdin = stdin
+
+
+@cli.command()
+@click.argument("spec", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.argument("inputs", nargs=-1)
+@click.option(
+    "-f",
+    "input_file",
+    type=click.File("r"),
+    help="file with urls or file paths, one per line; read from stdin when no inputs are given",
+)
+@click.option("-o", "output", type=click.File("w"), default="-", help="json lines output file")
+@click.option("-h", "headers", help='request headers, e.g. -h "user-agent=cat bot"', multiple=True)
+@click.option("--cache", help="cache requests", is_flag=True)
+@click.option("--concurrency", help="amount of concurrent requests", default=8, show_default=True)
+@click.option("--per-host", help="amount of concurrent requests to a single host", default=4, show_default=True)
+@click.option("--workers", help="amount of processes evaluating selectors", default=1, show_default=True)
+@click.option(
+    "--chunk-size", help="amount of documents sent to a worker process at once", default=16, show_default=True
+)
+@click.option(
+    "--record",
+    help="stream documents and evaluate selectors against every RECORD element separately, e.g. --record url",
+)
+@click.option("--browser", is_flag=True, help="render pages in headless browser")
+@click.option("--browser-pages", help="amount of pages rendered concurrently", default=4, show_default=True)
+@click.option(
+    "--browser-wait",
+    type=click.Choice(["load", "domcontentloaded", "networkidle"]),
+    help="wait for browser page to reach some state",
+    default="domcontentloaded",
+    show_default=True,
+)
+@click.option(
+    "--browser-connect",
+    help="connect to running browser instead of launching one, e.g. http://localhost:9222 or ws://localhost:3000/",
+)
+@click.option("--block", "block_patterns", help="block browser requests to urls matching glob pattern", multiple=True)
+@click.option("--no-block", is_flag=True, help="let browser load images, fonts, media and third-party scripts")
+@click.option("--config", help="config file", default=CONFIG, show_default=True)
+@click.option("-v", "verbosity", help="verbosity level", count=True)
+def batch(
+    spec,
+    inputs,
+    input_file,
+    output,
+    headers,
+    cache,
+    concurrency,
+    per_host,
+    workers,
+    chunk_size,
+    record,
+    browser,
+    browser_pages,
+    browser_wait,
+    browser_connect,
+    block_patterns,
+    no_block,
+    config,
+    verbosity,
+):
+    """
+    Run selectors from SPEC file against many urls or local files and write results as json lines
+
+    SPEC is a toml or json file of named selectors that use the same syntax as the interactive shell:
+
+    \b
+        [selectors]
+        title = "h1::text --first --strip"
+        links = "//a/@href --xpath --absolute"
+    """
+    from parselcli.batch import load_spec, read_inputs, run_batch, run_records
+
+    setup_logging(verbosity)
+    config = get_config(Path(config))
+    specs = load_spec(spec)
+    log.debug(f"loaded selector specs: {specs}")
+    if not inputs:
+        inputs = input_file or sys.stdin
+    headers = get_headers(config, headers)
+    if browser:
+        from parselcli.render.browser import BLOCKED_RESOURCES, BrowserPool
+
+        if record:
+            raise click.UsageError("--record can't be used together with --browser")
+        pool = BrowserPool(
+            size=browser_pages,
+            headers=headers,
+            browser_kwargs={"headless": True},
+            connect=browser_connect,
+            block=() if no_block else BLOCKED_RESOURCES,
+            block_patterns=block_patterns,
+            block_third_party_scripts=not no_block,
+            wait_for_load=browser_wait,
+        )
+    else:
+        from parselcli.render.http import CachedHttpRenderer, FetchPool, HttpRenderer
+
+        renderer_cls = CachedHttpRenderer if cache else HttpRenderer
+        renderer = renderer_cls(
+            headers=headers,
+            cache_dir=config["requests"]["cache_dir"],
+            cache_size=config["requests"]["cache_size"],
+            cache_expire=config["requests"]["cache_expire"] if cache else -1,
+            pool_size=per_host,
+        )
+        pool = FetchPool(renderer, concurrency=concurrency, per_host=per_host)
+    with pool:
+        if record:
+            results = run_records(specs, read_inputs(inputs), pool, tag=record)
+        else:
+            results = run_batch(specs, read_inputs(inputs), pool, workers=workers, chunk_size=chunk_size)
+        for result in results:
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+
+
+@cli.command()
+@click.option("--host", help="host to listen on", default="127.0.0.1", show_default=True)
+@click.option("--port", help="port to listen on", default=8421, show_default=True)
+@click.option("--socket", "socket_path", type=click.Path(dir_okay=False), help="listen on unix socket instead")
+@click.option("-h", "headers", help='request headers, e.g. -h "user-agent=cat bot"', multiple=True)
+@click.option("--cache", help="cache requests", is_flag=True)
+@click.option("--documents", help="amount of parsed documents kept in memory", default=32, show_default=True)
+@click.option("--allow-files", help="allow requests to read local files and file:// urls", is_flag=True)
+@click.option("--config", help="config file", default=CONFIG, show_default=True)
+@click.option("-v", "verbosity", help="verbosity level", count=True)
+def serve(host, port, socket_path, headers, cache, documents, allow_files, config, verbosity):
+    """
+    Serve json api for evaluating selectors against urls or documents
+
+    Sessions, parsed documents and compiled selectors are kept in memory between requests:
+
+    \b
+        $ curl localhost:8421/select -d '{"url": "https://example.com", "selectors": {"title": "h1::text --first"}}'
+        {"url": "https://example.com", "status": 200, "data": {"title": "Example Domain"}}
+    """
+    from parselcli.render.http import CachedHttpRenderer, FetchPool, HttpRenderer
+    from parselcli.serve import SelectorService, serve as serve_api
+
+    setup_logging(verbosity)
+    config = get_config(Path(config))
+    renderer_cls = CachedHttpRenderer if cache else HttpRenderer
+    renderer = renderer_cls(
+        headers=get_headers(config, headers),
+        cache_dir=config["requests"]["cache_dir"],
+        cache_size=config["requests"]["cache_size"],
+        cache_expire=config["requests"]["cache_expire"] if cache else -1,
+    )
+    echo(f"serving on {socket_path or f'http://{host}:{port}'}")
+    with FetchPool(renderer) as pool:
+        service = SelectorService(pool, max_documents=documents, allow_files=allow_files)
+        serve_api(service, host=host, port=port, socket_path=socket_path)
 
 
 if __name__ == "__main__":
@@ -20,6 +20,10 @@ DEFAULT_CONFIG = {
     "color": True,
     "vi_mode": False,
     "warn_limit": 5000,
+    "output_history_size": 100,
+    "output_history_bytes": 64 * 1024 * 1024,
+    "output_history_disk_bytes": 512 * 1024 * 1024,
+    "max_tabs": 10,
     "initial_input": [],
     "history_file_css": str(CACHE_DIR / "history_css"),
     "history_file_xpath": str(CACHE_DIR / "history_xpath"),
@@ -35,41 +39,42 @@ DEFAULT_CONFIG = {
             "Accept-Language": "en-US,en;q=0.9,lt;q=0.8,et;q=0.7,de;q=0.6",
         },
         "cache_expire": 86400,
-        "cache_file": str(CACHE_DIR / "requests.cache"),
+        "cache_dir": str(CACHE_DIR / "http"),
+        "cache_size": 1024**3,
     },
 }
 
 
+def write_config(config, config_dir=None):
+    """write config atomically so concurrently starting processes never read a partial file"""
+    config_dir = Path(config_dir or CONFIG)
+    config_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp = config_dir.with_name(f".{config_dir.name}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        toml.dump(config, f)
+    os.replace(tmp, config_dir)
+
+
 def init_default_config(config_dir=None):
     """Create config"""
-    if not config_dir:
-        config_dir = CONFIG
-    with open(config_dir, "w") as f:
-        toml.dump(DEFAULT_CONFIG, f)
+    write_config(DEFAULT_CONFIG, config_dir)
 
 
 def update_config(config, config_dir=None):
-    """update disk config with current config object"""
-    if not config_dir:
-        config_dir = CONFIG
+    """update disk config with missing default values; file is only written if some were missing"""
     updated_config = lazy_dict_merge(config, DEFAULT_CONFIG)
-    with open(config_dir, "w") as f:
-        toml.dump(updated_config, f)
+    if updated_config != config:
+        write_config(updated_config, config_dir)
     return updated_config
 
 
 def get_config(config_dir=None):
-    """returns config file from config directory. Any unset values default to DEFAULT_CONFIG configuration"""
-    if not config_dir:
-        config_dir = CONFIG
+    """
+    returns config file from config directory. Any unset values default to DEFAULT_CONFIG configuration
+    """
+    config_dir = Path(config_dir or CONFIG)
     if not config_dir.exists():
-        init_default_config()
+        init_default_config(config_dir)
     with open(config_dir, "r") as f:
         config = toml.loads(f.read())
-    config = update_config(config, config_dir=config_dir)
-    # ensure history and cache files exists
-    Path(config["requests"]["cache_file"]).parent.mkdir(exist_ok=True, parents=True)
-    Path(config["requests"]["cache_file"]).touch(exist_ok=True)
-    Path(config["history_file_css"]).touch(exist_ok=True)
-    Path(config["history_file_xpath"]).touch(exist_ok=True)
-    return config
+    return update_config(config, config_dir=config_dir)
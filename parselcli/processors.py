@@ -2,27 +2,70 @@
 Contains processor callables for parselcli
 """
 import re
+from abc import ABC, abstractmethod
 from decimal import Decimal
+from functools import partial
+from itertools import repeat
 from urllib.parse import urljoin
-from typing import Tuple, Union, Dict, List
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Optional, Tuple, Union, Dict, List
 
-from bs4 import BeautifulSoup
-from requests import Response
+from lxml import etree
 from loguru import logger as log
 
+from parselcli.utils import prettify_html_lxml
+
+if TYPE_CHECKING:
+    from requests import Response
+
+# pretty formatted elements are cut once they are longer than this (in characters)
+PRETTY_SIZE_LIMIT = 100 * 1024
+
 
 class Processor:
     """Base class for parselcli processors"""
 
     def __call__(
-        self, values: Union[List[str], str], response: Response = None, default: str = ""
+        self, values: Union[List[str], str], response: "Response" = None, default: str = ""
     ) -> Tuple[Union[List[str], str], Dict]:
         pass
 
+    def process_results(
+        self, results: List[Any], extract: Callable[[Any], str], response: "Response" = None
+    ) -> Optional[Tuple[Union[List[str], str], Dict]]:
+        """
+        Process raw selector results (e.g. lxml elements) before they are serialized to strings by `extract`,
+        so processors that only need some of the results (e.g. first one or their count) serialize only those.
+        Only called for the first processor of a chain; returns None if processor only works with strings.
+        """
+        return None
+
     def __repr__(self) -> str:
         return f"{type(self).__name__}"
 
 
+class ElementProcessor(Processor, ABC):
+    """
+    Base class for processors that transform every value separately.
+    Adjacent element processors are fused by Pipeline into a single pass over values.
+    """
+
+    # whether empty values are dropped from lists after transforming them
+    drop_empty = False
+
+    @abstractmethod
+    def map(self, values: Iterable[str], response: "Response" = None) -> Iterator[str]:
+        """lazily transform every value"""
+
+    def __call__(
+        self, values: Union[List[str], str], response: "Response" = None, default: str = ""
+    ) -> Tuple[Union[List[str], str], Dict]:
+        if isinstance(values, list):
+            values = self.map(values, response=response)
+            return list(filter(None, values) if self.drop_empty else values), {}
+        (value,) = self.map([values], response=response)
+        return value, {}
+
+
 class Nth(Processor):
     """Take nth element of a list"""
 
@@ -30,10 +73,15 @@ class Nth(Processor):
         self.position = int(position)
 
     def __call__(
-        self, values: Union[List[str], str], response: Response = None, default: str = ""
+        self, values: Union[List[str], str], response: "Response" = None, default: str = ""
     ) -> Tuple[Union[List[str], str], Dict]:
         return values[self.position], {}
 
+    def process_results(
+        self, results: List[Any], extract: Callable[[Any], str], response: "Response" = None
+    ) -> Optional[Tuple[Union[List[str], str], Dict]]:
+        return extract(results[self.position]), {}
+
     def __repr__(self) -> str:
         return f"{type(self).__name__}({self.position})"
 
@@ -45,7 +93,7 @@ class Join(Processor):
         self.sep = sep
 
     def __call__(
-        self, values: Union[List[str], str], response: Response = None, default: str = ""
+        self, values: Union[List[str], str], response: "Response" = None, default: str = ""
     ) -> Tuple[Union[List[str], str], Dict]:
         return self.sep.join(values), {}
 
@@ -53,27 +101,26 @@ class Join(Processor):
         return f"{type(self).__name__}({repr(self.sep)})"
 
 
-class Strip(Processor):
+class Strip(ElementProcessor):
     """Strip trailing spaces"""
 
+    drop_empty = True
+
     def __init__(self, chars=None) -> None:
         self.chars = chars
         super().__init__()
 
-    def __call__(
-        self, values: Union[List[str], str], response: Response = None, default: str = ""
-    ) -> Tuple[Union[List[str], str], Dict]:
-        if isinstance(values, list):
-            values = [v.strip(self.chars) for v in values]
-            return [v for v in values if v], {}
-        return values.strip(self.chars), {}
+    def map(self, values: Iterable[str], response: "Response" = None) -> Iterator[str]:
+        if self.chars is None:
+            return map(str.strip, values)
+        return map(str.strip, values, repeat(self.chars))
 
 
 class Collapse(Processor):
     """Collapse single element lists"""
 
     def __call__(
-        self, values: Union[List[str], str], response: Response = None, default: str = ""
+        self, values: Union[List[str], str], response: "Response" = None, default: str = ""
     ) -> Tuple[Union[List[str], str], Dict]:
         if isinstance(values, list) and len(values) == 1:
             return values[0], {}
@@ -84,99 +131,102 @@ class First(Processor):
     """Take first element if possible"""
 
     def __call__(
-        self, values: Union[List[str], str], response: Response = None, default: str = ""
+        self, values: Union[List[str], str], response: "Response" = None, default: str = ""
     ) -> Tuple[Union[List[str], str], Dict]:
         if isinstance(values, list):
             return values[0], {}
         return values or default, {}
 
+    def process_results(
+        self, results: List[Any], extract: Callable[[Any], str], response: "Response" = None
+    ) -> Optional[Tuple[Union[List[str], str], Dict]]:
+        return extract(results[0]), {}
+
 
-class AbsoluteUrl(Processor):
+class AbsoluteUrl(ElementProcessor):
     """Urljoin element"""
 
-    def __call__(
-        self, values: Union[List[str], str], response: Response = None, default: str = ""
-    ) -> Tuple[Union[List[str], str], Dict]:
-        log.debug(f"converting urls from {response} to absolute: {values}")
+    def map(self, values: Iterable[str], response: "Response" = None) -> Iterator[str]:
+        log.debug(f"converting urls from {response} to absolute")
         if not response:
-            return values, {}
-        if isinstance(values, list):
-            return [urljoin(response.url, v) for v in values], {}
-        return urljoin(response.url, values), {}
+            return iter(values)
+        return map(partial(urljoin, response.url), values)
 
 
 class Len(Processor):
     """Return length"""
 
     def __call__(
-        self, values: Union[List[str], str], response: Response = None, default: str = ""
+        self, values: Union[List[str], str], response: "Response" = None, default: str = ""
     ) -> Tuple[Union[List[str], str], Dict]:
         return str(len(values)), {}
 
+    def process_results(
+        self, results: List[Any], extract: Callable[[Any], str], response: "Response" = None
+    ) -> Optional[Tuple[Union[List[str], str], Dict]]:
+        # results don't need to be serialized to be counted
+        return str(len(results)), {}
+
 
 class Repr(Processor):
     """return representation of value"""
 
     def __call__(
-        self, values: Union[List[str], str], response: Response = None, default: str = ""
+        self, values: Union[List[str], str], response: "Response" = None, default: str = ""
     ) -> Tuple[Union[List[str], str], Dict]:
         return repr(values), {}
 
 
-class FormatHtml(Processor):
+class FormatHtml(ElementProcessor):
     """Processor for pretty format of XML elements"""
 
     re_html = re.compile("^<.+?>")
 
+    def __init__(self, max_size: Optional[int] = PRETTY_SIZE_LIMIT) -> None:
+        self.max_size = max_size
+
     def format(self, element: str):
         """Format string as pretty html."""
         # skip non html elements
         if not bool(self.re_html.search(element)):
             return element
-        soup = BeautifulSoup(element, features="lxml")
-        text = soup.body.prettify()
-        if text.startswith("<body>"):  # remove <body> wrapper
-            text = "\n".join(line[1:] for line in text.splitlines()[1:-1])
-        return text
+        return prettify_html_lxml(element, max_size=self.max_size)
 
-    def __call__(
-        self, values: Union[List[str], str], response: Response = None, default: str = ""
-    ) -> Tuple[Union[List[str], str], Dict]:
-        if isinstance(values, list):
-            return [self.format(element) for element in values], {}
-        return self.format(values), {}
+    def map(self, values: Iterable[str], response: "Response" = None) -> Iterator[str]:
+        return map(self.format, values)
+
+    def process_results(
+        self, results: List[Any], extract: Callable[[Any], str], response: "Response" = None
+    ) -> Optional[Tuple[Union[List[str], str], Dict]]:
+        # elements are formatted directly rather than serialized and parsed again
+        return [
+            prettify_html_lxml(result, max_size=self.max_size)
+            if isinstance(result, etree._Element)  # pylint: disable=W0212
+            else self.format(extract(result))
+            for result in results
+        ], {}
 
 
-class Regex(Processor):
+class Regex(ElementProcessor):
     """Regex processor that filters out non-matching values"""
 
     def __init__(self, pattern: str, flags=0) -> None:
         self.pattern = re.compile(pattern, flags)
 
-    def check(self, value: str):
+    def map(self, values: Iterable[str], response: "Response" = None) -> Iterator[str]:
         """
-        check whether value matches processor's pattern
-        returns either:
-        - found group if there's only 1 found group
-        - list of found groups if there are any
-        - value if it matches
-        - "" if no matches are found
+        transform every value to either:
+        - found group if pattern has 1 group
+        - list of found groups if pattern has more groups
+        - value itself if pattern has no groups and matches
+        - "" if pattern doesn't match
         """
-        search = self.pattern.search(value)
-        if not search:
-            return ""
-        if search.groups():
-            if len(search.groups()) == 1:
-                return search.groups()[0]
-            return list(search.groups())
-        return value
-
-    def __call__(
-        self, values: Union[List[str], str], response: Response = None, default: str = ""
-    ) -> Tuple[Union[List[str], str], Dict]:
-        if isinstance(values, list):
-            return [self.check(value) for value in values], {}
-        return self.check(values), {}
+        search = self.pattern.search
+        if self.pattern.groups == 0:
+            return (value if search(value) else "" for value in values)
+        if self.pattern.groups == 1:
+            return (match.group(1) if match else "" for match in map(search, values))
+        return (list(match.groups()) if match else "" for match in map(search, values))
 
 
 class Slice(Processor):
@@ -187,10 +237,15 @@ class Slice(Processor):
         self.slice = slice(*(int(val) if val is not None else val for val in self._value.split(":")))
 
     def __call__(
-        self, values: Union[List[str], str], response: Response = None, default: str = ""
+        self, values: Union[List[str], str], response: "Response" = None, default: str = ""
     ) -> Tuple[Union[List[str], str], Dict]:
         return values[self.slice], {}
 
+    def process_results(
+        self, results: List[Any], extract: Callable[[Any], str], response: "Response" = None
+    ) -> Optional[Tuple[Union[List[str], str], Dict]]:
+        return [extract(result) for result in results[self.slice]], {}
+
     def __repr__(self) -> str:
         return f"{type(self).__name__}({self._value})"
 
@@ -199,7 +254,7 @@ class Sum(Processor):
     """sum all values"""
 
     def __call__(
-        self, values: Union[List[str], str], response: Response = None, default: str = ""
+        self, values: Union[List[str], str], response: "Response" = None, default: str = ""
     ) -> Tuple[Union[List[str], str], Dict]:
         if not isinstance(values, list):
             return values, {}
@@ -210,8 +265,108 @@ class Sum(Processor):
 
 class Unique(Processor):
     def __call__(
-        self, values: Union[List[str], str], response: Response = None, default: str = ""
+        self, values: Union[List[str], str], response: "Response" = None, default: str = ""
     ) -> Tuple[Union[List[str], str], Dict]:
         if not isinstance(values, list):
             return values, {}
         return list(dict.fromkeys(values).keys()), {}
+
+
+class Fused(ElementProcessor):
+    """adjacent element processors applied in a single pass without intermediate lists"""
+
+    def __init__(self, processors: List[ElementProcessor]) -> None:
+        self.processors = processors
+
+    def map(self, values: Iterable[str], response: "Response" = None) -> Iterator[str]:
+        for processor in self.processors:
+            values = processor.map(values, response=response)
+            if processor.drop_empty:
+                values = filter(None, values)
+        return values
+
+    def __call__(
+        self, values: Union[List[str], str], response: "Response" = None, default: str = ""
+    ) -> Tuple[Union[List[str], str], Dict]:
+        if isinstance(values, list):
+            return list(self.map(values, response=response)), {}
+        for processor in self.processors:
+            values, _ = processor(values, response=response, default=default)
+        return values, {}
+
+    def process_results(
+        self, results: List[Any], extract: Callable[[Any], str], response: "Response" = None
+    ) -> Optional[Tuple[Union[List[str], str], Dict]]:
+        processed = self.processors[0].process_results(results, extract, response=response)
+        if processed is None or len(self.processors) == 1:
+            return processed
+        return Fused(self.processors[1:])(processed[0], response=response)
+
+    def __repr__(self) -> str:
+        return "+".join(repr(processor) for processor in self.processors)
+
+
+class Pipeline:
+    """
+    Processor chain compiled once: runs of adjacent element processors are fused,
+    so e.g. `--strip --re ... --absolute` goes over values once and creates a single list.
+    """
+
+    def __init__(self, processors: Iterable[Processor]) -> None:
+        self.processors = list(processors)
+        self.stages: List[Processor] = []
+        run: List[ElementProcessor] = []
+        for processor in self.processors + [None]:
+            if isinstance(processor, ElementProcessor):
+                run.append(processor)
+                continue
+            if run:
+                self.stages.append(run[0] if len(run) == 1 else Fused(run))
+                run = []
+            if processor is not None:
+                self.stages.append(processor)
+
+    def extract(
+        self, results: List[Any], extract: Callable[[Any], str], response: "Response" = None
+    ) -> Tuple[Union[List[str], str], Dict, List[Processor]]:
+        """
+        serialize raw selector results, letting the first stage process them before serialization if it can
+        returns values, meta and stages left to run
+        """
+        if self.stages:
+            processed = self.stages[0].process_results(results, extract, response=response)
+            if processed is not None:
+                return processed[0], processed[1], self.stages[1:]
+        return [extract(result) for result in results], {}, self.stages
+
+    def process_results(
+        self, results: List[Any], extract: Callable[[Any], str], response: "Response" = None
+    ) -> Tuple[Union[List[str], str], Dict]:
+        """process raw selector results through the chain"""
+        values, meta, stages = self.extract(results, extract, response=response)
+        return self._run(stages, values, meta, response)
+
+    def __call__(
+        self, values: Union[List[str], str], response: "Response" = None
+    ) -> Tuple[Union[List[str], str], Dict]:
+        return self._run(self.stages, values, {}, response)
+
+    @staticmethod
+    def _run(stages: List[Processor], values: Union[List[str], str], meta: Dict, response: "Response" = None):
+        for stage in stages:
+            values, _meta = stage(values, response=response)
+            if _meta:
+                meta.update(_meta)
+        return values, meta
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.stages})"
+
+
+def process(
+    values: Union[List[str], str], processors: Union[Pipeline, List[Processor]], response: "Response" = None
+) -> Tuple[Union[List[str], str], Dict]:
+    """Process values through a chain of processors."""
+    if not isinstance(processors, Pipeline):
+        processors = Pipeline(processors)
+    return processors(values, response=response)
@@ -1,16 +1,17 @@
 import webbrowser
 from functools import partial
 from tempfile import NamedTemporaryFile
-from typing import TYPE_CHECKING, Callable, Dict
+from typing import TYPE_CHECKING, Callable, Dict, Optional
 
-import pyperclip
 from click import echo
 from loguru import logger as log
 from parselcli.embed import embed_auto
 from parselcli.render import Renderer
+from parselcli.timings import format_duration
 
 if TYPE_CHECKING:
     from parselcli.prompt import Prompter
+    from parselcli.prompt.tabs import Tab
 
 echo = partial(echo, err=True)
 
@@ -26,11 +27,68 @@ class PromptCommands:
         return {name.split("cmd_")[1]: getattr(self, name) for name in dir(self) if name.startswith("cmd_")}
 
     def cmd_fetch(self, text):
-        """switch current session to different url by making a new request"""
+        """switch current session to different url by making a new request in background"""
         url = text.strip()
         echo(f"requesting: {url}")
-        self.prompt.renderer.goto(url)
-        self.prompt.create_completers(self.renderer.selector)
+        self.prompt.fetch(url)
+
+    def cmd_tabs(self):
+        """list documents open in tabs"""
+        for number, tab in enumerate(self.prompt.tabs, 1):
+            current = "*" if tab is self.prompt.tab else " "
+            elapsed = f" {format_duration(tab.elapsed)}" if tab.elapsed is not None and tab.status != "loading" else ""
+            echo(f"{current}{number:>3} [{tab.status}{elapsed}] {tab.title}")
+            if tab.error:
+                echo(f"      {tab.error}")
+
+    def _find_tab(self, text: str) -> "Optional[Tab]":
+        """tab by its number or url"""
+        text = text.strip()
+        if text.isdigit():
+            number = int(text)
+            if not 1 <= number <= len(self.prompt.tabs):
+                echo(f"no tab {number}; there are {len(self.prompt.tabs)} tabs")
+                return None
+            return self.prompt.tabs[number - 1]
+        for tab in self.prompt.tabs:
+            if text in (tab.url, tab.title):
+                return tab
+        return None
+
+    def cmd_tab(self, text):
+        """switch to tab by number or url; urls that aren't open are fetched in new tab"""
+        tab = self._find_tab(text)
+        if tab is None:
+            if not text.strip().isdigit():
+                echo(f"requesting in new tab: {text.strip()}")
+                self.prompt.fetch(text.strip(), new_tab=True)
+            return
+        if tab.status != "ready" and tab is not self.prompt.tab:
+            echo(f"tab {tab.title} is {tab.status}" + (f": {tab.error}" if tab.error else ""))
+            return
+        self.prompt.switch_tab(tab)
+        echo(f"switched to tab {self.prompt.tabs.index(tab) + 1}: {tab.title}")
+
+    def cmd_close_tab(self, text):
+        """close tab by number"""
+        tab = self._find_tab(text)
+        if tab is None:
+            return
+        if tab is self.prompt.tab:
+            echo("can't close current tab; switch to other tab first")
+            return
+        self.prompt.close_tab(tab)
+        echo(f"closed tab {tab.title}")
+
+    def cmd_prefetch(self):
+        """open urls of next query's output in background tabs"""
+        self.prompt.prefetch_next = True
+
+    def cmd_refresh(self):
+        """drop cached documents of current response, e.g. re-read DOM of a browser page"""
+        self.renderer.refresh()
+        self.prompt.update_completers()
+        echo("refreshed current document")
 
     def cmd_open(self):
         """open current response url in browser"""
@@ -57,7 +115,19 @@ class PromptCommands:
             echo("No response object attached")
         else:
             echo(f"{self.renderer.response.status_code} {self.renderer.response.url}")
+        if len(self.prompt.tabs) > 1:
+            echo(f"Tab {self.prompt.tabs.index(self.prompt.tab) + 1} of {len(self.prompt.tabs)}")
+        if self.prompt.fetching:
+            echo(f"Fetching in background: {self.prompt.fetching.url}")
+        elif self.prompt.fetch_error:
+            echo(f"Last fetch {self.prompt.fetch_error}")
         echo(f"Enabled processors: {self.prompt.active_processors}")
+        stats = ", ".join(f"{value} {key}" for key, value in sorted(self.renderer.cache_stats.items()))
+        echo(f"Document cache (v{self.renderer.version}): {stats or 'empty'}")
+        stats = self.prompt.selector_cache.stats
+        echo(f"Selector cache: {stats['size']} compiled, {stats['hits']} hits, {stats['misses']} misses")
+        if self.prompt.timings:
+            echo(f"Last query: {self.prompt.timings} (total {format_duration(self.prompt.timings.total)})")
 
     def cmd_embed(self):
         """Open current shell in embed repl"""
@@ -72,8 +142,8 @@ class PromptCommands:
             "p": getattr(self.renderer, "page", None),
             "outs": self.prompt.output_history,
             "out": self.prompt.output_history[-1] if self.prompt.output_history else None,
-            "in_css": list(self.prompt._history_file_css.load_history_strings()),
-            "in_xpath": list(self.prompt._history_file_xpath.load_history_strings()),
+            "in_css": list(self.prompt.history("css").load_history_strings()),
+            "in_xpath": list(self.prompt.history("xpath").load_history_strings()),
         }
         log.debug(f"embedding {self.prompt.preferred_embed_shell} shell")
         embed_auto(
@@ -102,8 +172,19 @@ class PromptCommands:
         self.prompt.use_vi_mode = not self.prompt.use_vi_mode
         echo(f"vi mode turned {'ON' if self.prompt.use_vi_mode else 'OFF'}")
 
+    def cmd_pager(self):
+        """toggles paging of long outputs"""
+        self.prompt.use_pager = not self.prompt.use_pager
+        echo(f"pager turned {'ON' if self.prompt.use_pager else 'OFF'}")
+
+    def cmd_profile(self):
+        """profile next query"""
+        self.prompt.profile_next = True
+        echo("next query will be profiled")
+
     def cmd_clipin(self):
         """copy last input to clipboard"""
+        import pyperclip  # pylint: disable=C0415
         value = self.prompt.prompt_history.load_history_strings()
         next(value)  # need to skip first history element as it's "--clipin" command itself
         value = next(value)
@@ -112,6 +193,11 @@ class PromptCommands:
 
     def cmd_clipout(self):
         """copy last output to clipboard"""
-        value = self.prompt.output_history[0]
+        import pyperclip  # pylint: disable=C0415
+
+        if not self.prompt.output_history:
+            echo("no output to copy")
+            return
+        value = self.prompt.output_history[-1]
         pyperclip.copy(repr(value))
         echo(f"copied {value if len(value)<100 else value[:100] + '<...>'} to clipboard")
@@ -1,51 +1,102 @@
 """
 contains tab completion functionality for prompt-toolkit input
 """
+from bisect import bisect_left
+from heapq import nsmallest
+from typing import Dict, List, Optional, Tuple
+
 from prompt_toolkit.completion import Completion, WordCompleter
 
-XPATH_COMPLETION = [
-    "text()",
-    "contains(",
-    "re:test(",
-    "following-sibling(",
-    "position()",
-    "last()",
-]
-CSS_COMPLETION = ["::text", "::attr("]
+# re-exported for code that imported completion constants from here before they moved to utils
+from parselcli.prompt.utils import CSS_COMPLETION, XPATH_COMPLETION  # noqa: F401
 
+__all__ = ["CSS_COMPLETION", "XPATH_COMPLETION", "MAX_COMPLETIONS", "MiddleWordCompleter"]
 
-def ends_with_part(word, text):
-    """check whether text ends in a word"""
-    for i in range(len(word)):
-        if not word[:-i]:
-            continue
-        if text.endswith(word[:-i]):
-            return word, len(word[:-i])
+# maximum amount of completions shown at once
+MAX_COMPLETIONS = 100
 
 
 class MiddleWordCompleter(WordCompleter):
-    """completer that considers middle of the word"""
+    """
+    completer that considers middle of the word
+
+    words are kept in a sorted index so every ending of the input
+    can be looked up by binary search instead of checking every word
+    """
 
     def __init__(self, words, **kwargs):
         self.match_end = kwargs.pop("match_end", None)
+        self.frequencies: Dict[str, int] = kwargs.pop("frequencies", None) or {}
+        self.max_results = kwargs.pop("max_results", MAX_COMPLETIONS)
         super().__init__(words, **kwargs)
+        self._index: Optional[List[Tuple[str, int, str]]] = None
+        self._keys: List[str] = []
+        self._max_length = 0
+        self._ranked: List[int] = []
 
-    def get_completions(self, document, complete_event):
-        # Get word/text before cursor.
-        word_before_cursor = document.text_before_cursor
+    @property
+    def index(self) -> List[Tuple[str, int, str]]:
+        """sorted index of (key, position, word) items; built on first use"""
+        if self._index is None:
+            self.build_index()
+        return self._index
+
+    def build_index(self):
+        """index current words"""
+        words = self.words() if callable(self.words) else self.words
+        index = sorted(
+            (word.lower() if self.ignore_case else word, position, word) for position, word in enumerate(words)
+        )
+        self._keys = [key for key, _, _ in index]
+        self._max_length = max((len(key) for key in self._keys), default=0)
+        # index positions ordered by rank, used to scan very wide matches without sorting them
+        self._ranked = sorted(range(len(index)), key=lambda i: self._rank(index[i]))
+        self._index = index
+
+    def _rank(self, item: Tuple[str, int, str]) -> Tuple[int, int]:
+        _, position, word = item
+        return -self.frequencies.get(word, 0), position
+
+    def _best(self, start: int, end: int, length: int, limit: int, seen: set) -> List[Tuple[str, int, str]]:
+        """best ranked index items between start and end that are longer than length"""
+        if (end - start) * limit < len(self._index):
+            candidates = (item for item in self._index[start:end] if len(item[0]) > length and item[1] not in seen)
+            return nsmallest(limit, candidates, key=self._rank)
+        # match covers big part of index so it's quicker to take matching items in ranked order
+        best = []
+        for i in self._ranked:
+            item = self._index[i]
+            if start <= i < end and len(item[0]) > length and item[1] not in seen:
+                best.append(item)
+                if len(best) == limit:
+                    break
+        return best
+
+    def find(self, text: str) -> List[Tuple[str, int]]:
+        """
+        find words that start with some ending of text
+        returns (word, matched length) tuples, longest matches and most frequent words first
+        """
+        if self._index is None:
+            self.build_index()
         if self.ignore_case:
-            word_before_cursor = word_before_cursor.lower()
-
-        def word_matches(word):
-            """True when the word before the cursor matches."""
-            if self.ignore_case:
-                word = word.lower()
-            return ends_with_part(word, word_before_cursor)
-
-        matches = [word_matches(a) for a in self.words]
-        matches = [m for m in matches if m]
-        matches = sorted(matches, key=lambda v: v[1], reverse=True)
-        for m in matches:
-            word, length = m
+            text = text.lower()
+        found, seen = [], set()
+        # whole word is never a match, only its beginning
+        for length in range(min(len(text), self._max_length - 1), 0, -1):
+            part = text[-length:]
+            start = bisect_left(self._keys, part)
+            end = bisect_left(self._keys, part + "\U0010ffff", lo=start)
+            if start == end:
+                continue
+            for _, position, word in self._best(start, end, length, self.max_results - len(found), seen):
+                seen.add(position)
+                found.append((word, length))
+            if len(found) >= self.max_results:
+                break
+        return found
+
+    def get_completions(self, document, complete_event):
+        for word, length in self.find(document.text_before_cursor):
             display_meta = self.meta_dict.get(word, "")
             yield Completion(word, -length, display_meta=display_meta)
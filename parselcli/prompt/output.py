@@ -0,0 +1,162 @@
+"""
+contains output functionality: printing long results incrementally rather than rendering them at once
+and keeping bounded history of outputs
+"""
+import pickle
+import tempfile
+import zlib
+from collections import deque
+from collections.abc import Sequence
+from itertools import islice
+from typing import IO, Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+# lists with more values than this are streamed instead of being rendered by rich
+STREAM_SIZE = 200
+# amount of lines written at once when streaming
+CHUNK_SIZE = 1000
+
+
+def iter_lines(values: List, limit: Optional[int] = None) -> Iterator[str]:
+    """
+    yield lines of list representation in the same expanded form rich prints long lists in
+    only first `limit` values are represented when limit is set
+
+    >>> list(iter_lines(["a", "b", "c"], limit=2))
+    ['[\\n', "    'a',\\n", "    'b',\\n", '    ... 1 more\\n', ']\\n']
+    """
+    shown = len(values) if limit is None else min(limit, len(values))
+    last = len(values) - 1
+    yield "[\n"
+    for i, value in enumerate(islice(values, shown)):
+        yield f"    {value!r},\n" if i < last else f"    {value!r}\n"
+    if shown < len(values):
+        yield f"    ... {len(values) - shown} more\n"
+    yield "]\n"
+
+
+def iter_repr(values: List) -> Iterator[str]:
+    """
+    yield parts of list's repr on a single line, so long lists can be written without building whole string
+
+    >>> "".join(iter_repr(["a", 1])) == repr(["a", 1]) + "\\n"
+    True
+    """
+    yield "["
+    for i, value in enumerate(values):
+        yield f"{value!r}" if i == 0 else f", {value!r}"
+    yield "]\n"
+
+
+def write_lines(lines: Iterable[str], write: Callable[[str], None], chunk_size: int = CHUNK_SIZE):
+    """write lines in chunks so output appears incrementally without a write call per line"""
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == chunk_size:
+            write("".join(chunk))
+            chunk = []
+    if chunk:
+        write("".join(chunk))
+
+
+def output_size(value: Any) -> int:
+    """rough size of output in bytes"""
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, list):
+        return sum(output_size(v) for v in value) + 8 * len(value)
+    return len(repr(value))
+
+
+class OutputHistory(Sequence):
+    """
+    History of outputs that keeps at most `max_entries` latest outputs taking up to `max_bytes` in memory.
+    Older outputs are spilled to a temporary file as compressed pickle records and read back when accessed,
+    e.g. `outs[0]` in embedded shell. Once spilled records take up more than `max_disk_bytes`
+    the oldest ones are forgotten and the file is rewritten with the rest.
+    """
+
+    def __init__(
+        self, max_entries: int = 100, max_bytes: int = 64 * 1024 * 1024, max_disk_bytes: int = 512 * 1024 * 1024
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "deque[Tuple[Any, int]]" = deque()
+        self._memory_bytes = 0
+        # (offset, length) of spilled records in order they were added
+        self._spilled: "deque[Tuple[int, int]]" = deque()
+        self._spilled_bytes = 0
+        self._file: Optional[IO[bytes]] = None
+
+    def append(self, value: Any):
+        size = output_size(value)
+        self._memory.append((value, size))
+        self._memory_bytes += size
+        while len(self._memory) > 1 and (
+            len(self._memory) > self.max_entries or self._memory_bytes > self.max_bytes
+        ):
+            self._spill()
+
+    def _spill(self):
+        """move oldest output in memory to file"""
+        value, size = self._memory.popleft()
+        self._memory_bytes -= size
+        if self._file is None:
+            self._file = tempfile.TemporaryFile(prefix="parsel-outputs-")  # pylint: disable=R1732
+        try:
+            data = pickle.dumps(value)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            data = pickle.dumps(str(value))
+        record = zlib.compress(data)
+        offset = self._file.seek(0, 2)
+        self._file.write(record)
+        self._spilled.append((offset, len(record)))
+        self._spilled_bytes += len(record)
+        if self._spilled_bytes > self.max_disk_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        """forget oldest spilled outputs until half of disk budget is used and rewrite file without them"""
+        while self._spilled and self._spilled_bytes > self.max_disk_bytes // 2:
+            _, length = self._spilled.popleft()
+            self._spilled_bytes -= length
+        old, self._file = self._file, tempfile.TemporaryFile(prefix="parsel-outputs-")  # pylint: disable=R1732
+        spilled = deque()
+        for offset, length in self._spilled:
+            old.seek(offset)
+            spilled.append((self._file.tell(), length))
+            self._file.write(old.read(length))
+        old.close()
+        self._spilled = spilled
+
+    def _load(self, index: int) -> Any:
+        offset, length = self._spilled[index]
+        self._file.seek(offset)
+        return pickle.loads(zlib.decompress(self._file.read(length)))
+
+    def __len__(self) -> int:
+        return len(self._spilled) + len(self._memory)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("output history index out of range")
+        if index < len(self._spilled):
+            return self._load(index)
+        return self._memory[index - len(self._spilled)][0]
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({len(self)} outputs, {len(self._spilled)} on disk)"
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._spilled.clear()
+        self._spilled_bytes = 0
+        self._memory.clear()
+        self._memory_bytes = 0
@@ -1,22 +1,29 @@
 """ Contains main flow tool for parselcli and related helper functions """
+# pylint: disable=C0415
 import re
+import sys
+import time
 from shlex import shlex
 from functools import partial
-from typing import Any, List, Optional, Tuple, Dict
+from pathlib import Path
+from pprint import pformat
+from concurrent.futures import Future
+from threading import Lock, Thread
+from typing import TYPE_CHECKING, Any, Iterable, List, Optional, Tuple, Dict
+from urllib.parse import urlparse
 
 import click
 from click import BadOptionUsage, NoSuchOption, Option, OptionParser, echo
 from loguru import logger as log
 from parsel import Selector
-from prompt_toolkit import PromptSession
-from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
-from prompt_toolkit.history import FileHistory
-from prompt_toolkit.lexers import SimpleLexer
-from rich.console import Console
-
-from parselcli.prompt.completer import MiddleWordCompleter
-from parselcli.prompt.utils import get_css_completion, get_xpath_completion
+
+from parselcli.prompt.output import STREAM_SIZE, OutputHistory, iter_lines, iter_repr, write_lines
+from parselcli.prompt.tabs import Tab
+from parselcli.prompt.utils import Vocabulary, find_vocabulary, get_css_completion, get_xpath_completion
 from parselcli.render import Renderer
+from parselcli.render.file import local_path
+from parselcli.selectors import CACHE, SelectorCache
+from parselcli.timings import Timings
 from parselcli.prompt.commands import PromptCommands
 from parselcli.processors import (
     AbsoluteUrl,
@@ -26,6 +33,7 @@ from parselcli.processors import (
     Join,
     Len,
     Nth,
+    Pipeline,
     Processor,
     Slice,
     Strip,
@@ -35,8 +43,24 @@ from parselcli.processors import (
     Unique,
 )
 
+if TYPE_CHECKING:
+    from parselcli.render.http import FetchPool
+
 echo = partial(echo, err=True)
 
+# documents bigger than this (in bytes) have their completers created in a background thread
+LAZY_COMPLETION_SIZE = 2 * 1024 * 1024
+# amount of functions --profile prints
+PROFILE_FRAMES = 25
+# phase timings that describe current document rather than single query
+DOCUMENT_PHASES = ("fetch",)
+# seconds between bottom toolbar redraws, e.g. to show background fetch progress
+TOOLBAR_REFRESH_INTERVAL = 0.5
+# seconds completers of a document that keeps mutating (e.g. javascript page in browser) are kept before rebuilding
+COMPLETER_REFRESH_INTERVAL = 10
+# documents loaded into tabs at once by --fetch and --prefetch
+PREFETCH_WORKERS = 4
+
 
 class Prompter:
     """
@@ -69,7 +93,14 @@ class Prompter:
         Option(["--open"], is_flag=True, help="open current url in web browser"),
         Option(["--view"], is_flag=True, help="open current doc in web browser"),
         Option(["--vi"], is_flag=True, help="toggle input to/from vi mode"),
+        Option(["--pager"], is_flag=True, help="toggle paging of long outputs"),
         Option(["--fetch"], help="request new url"),
+        Option(["--refresh"], is_flag=True, help="re-read current document, e.g. after browser page has changed"),
+        Option(["--profile"], is_flag=True, help="profile next query and print functions it spent most time in"),
+        Option(["--tabs"], is_flag=True, help="list documents open in tabs"),
+        Option(["--tab"], help="switch to tab by its number or url; urls that aren't open are fetched in new tab"),
+        Option(["--close-tab"], help="close tab by its number"),
+        Option(["--prefetch"], is_flag=True, help="open urls of query output (or last output) in background tabs"),
         Option(["--clipin"], is_flag=True, help="copy last input to clipboard"),
         Option(["--clipout"], is_flag=True, help="copy last output to clipboard"),
     ]
@@ -126,72 +157,341 @@ class Prompter:
         color=True,
         vi_mode=False,
         preferred_embed=None,
+        selector_cache: SelectorCache = CACHE,
+        warn_limit: Optional[int] = 5000,
+        output_history_size: int = 100,
+        output_history_bytes: int = 64 * 1024 * 1024,
+        output_history_disk_bytes: int = 512 * 1024 * 1024,
+        max_tabs: int = 10,
     ):
         """
         :param renderer: TODO
         :param start_in_css: whether to start in css mode instead of xpath
         :param flags: default flags to enable
+        :param selector_cache: cache of compiled selectors; shared by whole process by default
+        :param warn_limit: only this many values of long outputs are printed unless pager is enabled
+        :param output_history_size: amount of latest outputs kept in memory; older ones are moved to disk
+        :param output_history_bytes: maximum size of outputs kept in memory
+        :param output_history_disk_bytes: maximum size of outputs moved to disk; oldest ones are forgotten
+        :param max_tabs: maximum amount of documents kept open in tabs
         """
         self._option_parser = None
         self._flags = None
         self._commands = None
         self._sel = None
         self._processors = None
+        self._completers_version = None
+        # renderer loads and time completers were created at, so rebuilds for mutating documents can be limited
+        self._completers_loads = None
+        self._completers_created = 0.0
+        self._completer_css = None
+        self._completer_xpath = None
+        self._console = None
+        self._histories = {}
+        self._pipeline = Pipeline([])
 
         self.use_color = color
         self.use_vi_mode = vi_mode
         self.preferred_embed_shell = preferred_embed
+        self.selector_cache = selector_cache
+        self.warn_limit = warn_limit
+        self.use_pager = False
+        self.profile_next = False
+        self.timings = Timings()
+        # document being fetched in background and error of the last fetch
+        self.fetching: Optional[Tab] = None
+        self._fetch_future: Optional[Future] = None
+        self.fetch_error: Optional[str] = None
+        self.max_tabs = max_tabs
+        # document of current tab lives in renderer
+        self.tab = Tab(renderer.response.url if renderer.response is not None else "")
+        self.tab.response = renderer.response
+        self.tabs: List[Tab] = [self.tab]
+        self.prefetch_next = False
+        self._fetch_pool: Optional["FetchPool"] = None
+        self._prefetches: List[Future] = []
+        # held while a query runs so background fetch never swaps document in the middle of it;
+        # tabs are changed only while holding it too
+        self._document_lock = Lock()
 
-        self.console = Console(soft_wrap=True, highlight=self.use_color, markup=True)
-        self._history_file_css = FileHistory(history_file_css)
-        self._history_file_xpath = FileHistory(history_file_xpath)
         self._history_file_embed = history_file_embed
+        self.history_files = {"css": history_file_css, "xpath": history_file_xpath}
         self.mode = "css" if start_in_css else "xpath"
 
         self.renderer = renderer
         self.active_processors = []
         self.cmd = PromptCommands(self)
+        self.output_history = OutputHistory(
+            max_entries=output_history_size, max_bytes=output_history_bytes, max_disk_bytes=output_history_disk_bytes
+        )
+
+    @property
+    def console(self):
+        """rich console for printing output; created on first use as rich is slow to import"""
+        if self._console is None:
+            from rich.console import Console
+
+            self._console = Console(soft_wrap=True, highlight=self.use_color, markup=True)
+        return self._console
+
+    def history(self, mode: str):
+        """input history of css or xpath mode"""
+        if mode not in self._histories:
+            from prompt_toolkit.history import FileHistory
 
-        # setup completers
-        self.create_completers(self.renderer.selector)
-        self.output_history = []
+            filename = self.history_files[mode]
+            if filename:
+                Path(filename).parent.mkdir(parents=True, exist_ok=True)
+            self._histories[mode] = FileHistory(filename)
+        return self._histories[mode]
 
     @property
     def prompt_history(self):
-        if self.mode == "css":
-            return self._history_file_css
-        return self._history_file_xpath
+        return self.history(self.mode)
 
     @property
     def completer(self):
+        """completer of current mode; completers are created on first use and when document changes"""
+        self.update_completers()
         if self.mode == "css":
             return self._completer_css
         return self._completer_xpath
 
-    def create_completers(self, selector: Selector):
-        """Initiated auto completers based on current selector"""
-        log.debug("creating completers based on current selector")
+    def _current_completer(self):
+        """completer of current mode as it is, without creating it"""
+        return self._completer_css if self.mode == "css" else self._completer_xpath
+
+    @property
+    def vocabulary(self) -> Vocabulary:
+        """completion vocabulary of current document"""
+        return self.renderer.cached("vocabulary", lambda: find_vocabulary(self.renderer.selector))
+
+    def build_completers(self, vocabulary: Optional[Vocabulary] = None):
+        """create css and xpath auto completers based on document vocabulary"""
+        from parselcli.prompt.completer import MiddleWordCompleter
+
         base = [
             *self.option_parser._long_opt.keys(),  # pylint: disable=protected-access
             *self.option_parser._short_opt.keys(),  # pylint: disable=protected-access
         ]
-        self._completer_xpath = MiddleWordCompleter(
-            base + get_xpath_completion(selector) if selector else [],
+        css = MiddleWordCompleter(
+            base + get_css_completion(vocabulary) if vocabulary else base,
+            frequencies=vocabulary.css() if vocabulary else None,
             ignore_case=True,
             match_end=True,
             sentence=True,
         )
-        self._completer_css = MiddleWordCompleter(
-            base + get_css_completion(selector) if selector else [],
+        xpath = MiddleWordCompleter(
+            base + get_xpath_completion(vocabulary) if vocabulary else base,
+            frequencies=vocabulary.xpath() if vocabulary else None,
             ignore_case=True,
             match_end=True,
             sentence=True,
         )
+        return css, xpath
+
+    def create_completers(self, vocabulary: Optional[Vocabulary] = None):
+        """Initiated auto completers based on document vocabulary"""
+        log.debug("creating completers based on current vocabulary")
+        self._completer_css, self._completer_xpath = self.build_completers(vocabulary)
+
+    def update_completers(self):
+        """Create completers if current document has changed since they were last created"""
+        version = self.renderer.version
+        if version == self._completers_version or self._completers_recent():
+            return
+        self._completers_version = version
+        self._completers_loads = self.renderer.loads
+        self._completers_created = time.perf_counter()
+        if self.renderer.size < LAZY_COMPLETION_SIZE:
+            self.create_completers(self.vocabulary)
+            return
+        log.debug(f"document is bigger than {LAZY_COMPLETION_SIZE} bytes; creating completers in background")
+        self.create_completers()
+        # selector is retrieved here as some renderers (e.g. browser) can only be used from their own thread
+        selector = self.renderer.selector
+        Thread(target=self._create_completers_lazily, args=(version, selector), daemon=True).start()
+
+    def _completers_recent(self) -> bool:
+        """
+        whether completers exist for current document that has only mutated since they were created
+        not long ago; such stale completers are kept as rebuilding them re-serializes and parses whole document
+        """
+        if self._completer_css is None or self._completers_loads != self.renderer.loads:
+            return False
+        return time.perf_counter() - self._completers_created < COMPLETER_REFRESH_INTERVAL
+
+    def _create_completers_lazily(self, version: int, selector: Selector):
+        vocabulary = self.renderer.cached("vocabulary", lambda: find_vocabulary(selector))
+        completers = self.build_completers(vocabulary)
+        for completer in completers:
+            completer.build_index()
+        with self._document_lock:
+            # document could have changed while completers were being created
+            if version == self.renderer.version:
+                self._completer_css, self._completer_xpath = completers
+
+    def fetch(self, url: str, new_tab: bool = False):
+        """
+        switch to document of url in current or new tab; if renderer supports it document is retrieved, parsed
+        and has its completers created in background while current document stays in use,
+        then they are all swapped in at once
+        """
+        self.fetch_error = None
+        if not self.renderer.background_fetch:
+            if new_tab:
+                echo(f"{type(self.renderer).__name__} doesn't support tabs; use --fetch")
+                return
+            self.timings.reset()
+            with self.timings.phase("fetch"):
+                self.renderer.goto(url)
+            self.update_completers()
+            self.tab.url, self.tab.response = url, self.renderer.response
+            return
+        tab = Tab(url)
+        self.fetching = tab
+        replace = None if new_tab else self.tab
+        self._fetch_future = self.fetch_pool.submit(self._fetch_in_background, tab, replace)
+
+    def wait_for_fetch(self):
+        """
+        block until document being fetched in background is swapped in, e.g. before evaluating queries
+        of non-interactive runs; error of failed fetch is printed
+        """
+        if self._fetch_future is None:
+            return
+        self._fetch_future.result()
+        self._fetch_future = None
+        if self.fetch_error:
+            echo(self.fetch_error)
+
+    def _fetch_in_background(self, tab: Tab, replace: Optional[Tab]):
+        self.load_tab(tab)
+        with self._document_lock:
+            # superseded by a newer fetch
+            if self.fetching is not tab:
+                return
+            self.fetching = None
+            if tab.error:
+                self.fetch_error = tab.error
+                return
+            if replace in self.tabs:
+                self.tabs[self.tabs.index(replace)] = tab
+            else:
+                self.tabs.append(tab)
+            if replace is None or replace is self.tab:
+                self._switch_tab(tab)
+
+    @property
+    def fetch_pool(self) -> "FetchPool":
+        """
+        pool documents are loaded in background by; its workers keep their own sessions
+        and limit concurrent requests to a single host
+        """
+        if self._fetch_pool is None:
+            from parselcli.render.http import FetchPool
+
+            self._fetch_pool = FetchPool(self.renderer, concurrency=PREFETCH_WORKERS)
+            self._fetch_pool.open()
+        return self._fetch_pool
+
+    def load_tab(self, tab: Tab):
+        """retrieve and parse document of tab and create its completers; meant to be run in background"""
+        try:
+            response, documents = self.renderer.prepare(
+                tab.url, fetch=self.fetch_pool.fetch, vocabulary=find_vocabulary
+            )
+            completers = self.build_completers(documents["vocabulary"])
+            for completer in completers:
+                completer.build_index()
+        except Exception as exc:  # pylint: disable=W0703
+            log.exception(f"failed to fetch {tab.url}")
+            tab.failed(f"failed to fetch {tab.url}: {exc}")
+            return
+        tab.loaded(response, documents, completers)
+
+    def switch_tab(self, tab: Tab):
+        """make loaded tab current"""
+        with self._document_lock:
+            self._switch_tab(tab)
+
+    def _switch_tab(self, tab: Tab):
+        if tab is self.tab:
+            return
+        # park current document and completers in tab being left
+        self.tab.response, self.tab.documents = self.renderer.snapshot()
+        if self._completers_version == self.renderer.version:
+            self.tab.completers = (self._completer_css, self._completer_xpath)
+        self.renderer.load(tab.response, tab.documents)
+        if tab.completers:
+            self._completer_css, self._completer_xpath = tab.completers
+            self._completers_version = self.renderer.version
+            self._completers_loads = self.renderer.loads
+        self.tab = tab
+        self.timings.reset()
+        if tab.elapsed is not None:
+            self.timings.phases["fetch"] = tab.elapsed
+
+    def close_tab(self, tab: Tab):
+        """forget tab that isn't current"""
+        with self._document_lock:
+            self.tabs.remove(tab)
+
+    def prefetch(self, urls: Iterable[Any]) -> List[Tab]:
+        """
+        open urls in new tabs that are loaded in background by a small pool of workers;
+        values that aren't urls or local paths and urls that are already open are skipped
+        and at most `max_tabs` tabs are kept open
+        returns opened tabs
+        """
+        if not self.renderer.background_fetch:
+            echo(f"{type(self.renderer).__name__} doesn't support prefetching")
+            return []
+        if isinstance(urls, str):
+            urls = [urls]
+        opened = []
+        with self._document_lock:
+            open_urls = {url for tab in self.tabs for url in (tab.url, tab.title)}
+            for url in urls:
+                if not isinstance(url, str) or url in open_urls:
+                    continue
+                if urlparse(url).scheme not in ("http", "https", "file") and local_path(url) is None:
+                    log.debug(f"not prefetching {url!r} as it's not an absolute url or a local path")
+                    continue
+                if len(self.tabs) >= self.max_tabs:
+                    echo(f"tab limit of {self.max_tabs} reached; close some tabs with --close-tab")
+                    break
+                tab = Tab(url)
+                self.tabs.append(tab)
+                open_urls.add(url)
+                opened.append(tab)
+                self._prefetches.append(self.fetch_pool.submit(self.load_tab, tab))
+        return opened
+
+    def close(self):
+        """stop background loading; renderer is left open"""
+        for future in self._prefetches:
+            future.cancel()
+        if self._fetch_pool is not None:
+            self._fetch_pool.close(wait=False)
+            self._fetch_pool = None
 
     @property
     def bottom_toolbar(self):
         """generate prompt toolkit bottom toolbar HTML."""
         toolbar = "[vi]" if self.use_vi_mode else ""
+        # tabs are changed by background fetches; snapshot them rather than block redraws on the lock
+        tabs, current = list(self.tabs), self.tab
+        if len(tabs) > 1:
+            position = tabs.index(current) + 1 if current in tabs else "?"
+            toolbar += f" [tab {position}/{len(tabs)}]"
+            loading = sum(tab.status == "loading" for tab in tabs)
+            if loading:
+                toolbar += f" [prefetching {loading}]"
+        if self.fetching:
+            toolbar += f" [fetching {time.perf_counter() - self.fetching.started:.1f}s] {self.fetching.url} |"
+        elif self.fetch_error:
+            toolbar += f" [{self.fetch_error}] |"
         if self.renderer.response is not None:
             url = self.renderer.response.url
             if len(url) > 70:
@@ -199,39 +499,60 @@ class Prompter:
             cached = "cached" if getattr(self.renderer.response, "from_cache", None) else "live"
             toolbar += f" [{cached}] {self.renderer.response.status_code} {url}"
         toolbar += f" | {self.active_processors}"
+        if self.timings:
+            toolbar += f" | {self.timings}"
         log.debug(f"generating toolbar from {toolbar}")
         return toolbar
 
     @property
     def rprompt(self):
         """generate prompt toolkit right prompt"""
-        return "CSS" if self.completer is self._completer_css else "XPATH"
+        return "CSS" if self.mode == "css" else "XPATH"
 
     @property
     def selector(self):
-        """lazy selector; will initiate compelters on first call"""
-        sel = self.renderer.selector
-        self.create_completers(sel)
-        return sel
+        """current document selector"""
+        return self.renderer.selector
 
-    def process_data(self, data, processors=None) -> Tuple[Any, Dict]:
-        """Process data through enabled flag processors."""
+    def process_data(self, data, processors=None, extract=None) -> Tuple[Any, Dict]:
+        """
+        Process data through enabled flag processors.
+        When `extract` is given data are raw selector results that it serializes.
+        """
         if processors is None:
             processors = self.active_processors
+        if self._pipeline.processors != processors:
+            self._pipeline = Pipeline(processors)
+        meta = {}
+        response = self.renderer.response
+        stages = self._pipeline.stages
+        processor = stages[0] if stages else "extract"
         try:
-            meta = {}
-            for processor in processors:
-                data, _meta = processor(data, response=self.renderer.response)
-                meta.update(_meta)
+            if extract is not None:
+                # element processors fused with extraction are timed as part of it
+                with self.timings.phase("extract"):
+                    data, meta, stages = self._pipeline.extract(data, extract, response=response)
+                extract = None
+            with self.timings.phase("process"):
+                for processor in stages:
+                    data, _meta = processor(data, response=response)
+                    if _meta:
+                        meta.update(_meta)
         except Exception as exc:  # pylint: disable=W0703
             echo(f'processor "{processor}" failed: {exc}')
             log.exception("processor failed")
+            if extract is not None:
+                # processor failed on raw results, output them serialized like no processor had run
+                data = [extract(result) for result in data]
         return data, meta
 
     def _get_xpath(self, text, processors: Optional[List[Processor]] = None) -> Tuple[Any, Dict]:
         """Try to extract xpath from a selector."""
         try:
-            return self.process_data(self.selector.xpath(text).extract(), processors=processors)
+            results, extract = self.renderer.evaluate(
+                text, mode="xpath", cache=self.selector_cache, timings=self.timings
+            )
+            return self.process_data(results, processors=processors, extract=extract)
         except Exception as exc:  # pylint: disable=W0703
             echo(f'E:"{text}": {exc}')
             return self.process_data([], processors=processors)
@@ -239,7 +560,8 @@ class Prompter:
     def _get_css(self, text, processors: Optional[List[Processor]] = None) -> Tuple[Any, Dict]:
         """Try to extract css from a selector."""
         try:
-            return self.process_data(self.selector.css(text).extract(), processors=processors)
+            results, extract = self.renderer.evaluate(text, mode="css", cache=self.selector_cache, timings=self.timings)
+            return self.process_data(results, processors=processors, extract=extract)
         except Exception as exc:  # pylint: disable=W0703
             echo(f'E:"{text}": {exc}')
             return self.process_data([], processors=processors)
@@ -247,11 +569,14 @@ class Prompter:
     def select(self, selector, processors: Optional[List[Processor]] = None) -> Tuple[Any, Dict]:
         """try to extract css or xpath (based on current mode settings: self.mode)"""
         log.info(f'extracting {self.mode} "{selector}" with processors: {processors}')
-        if self.mode == "css":
-            return self._get_css(selector, processors)
-        return self._get_xpath(selector, processors)
+        with self._document_lock:
+            self.timings.reset(keep=DOCUMENT_PHASES)
+            if self.mode == "css":
+                return self._get_css(selector, processors)
+            return self._get_xpath(selector, processors)
 
-    def parse_input(self, text: str):
+    @classmethod
+    def parse_input(cls, text: str):
         """Parse commands and flags from a string."""
 
         def shlex_split(text):
@@ -261,13 +586,24 @@ class Prompter:
             lex.commenters = ""  # disable comment parsing
             return list(lex)
 
-        parsed, remainder, _ = self.option_parser.parse_args(shlex_split(text))
+        parsed, remainder, _ = cls.option_parser.parse_args(shlex_split(text))
         remainder = " ".join(remainder).strip()
         log.debug(f'parsed input: "{text}" to "{parsed}" with remainder "{remainder}"')
         return parsed, remainder
 
+    @classmethod
+    def create_processor(cls, name: str, value: Any) -> Processor:
+        """Create processor from parsed option."""
+        if value is True:
+            return cls.processors[name]()
+        return cls.processors[name](value)
+
     def loop_prompt(self, start_in_embed=False):
         """Run prompt loop that keeps reading input line and showing output until exit."""
+        from prompt_toolkit import PromptSession
+        from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
+        from prompt_toolkit.completion import DynamicCompleter
+        from prompt_toolkit.lexers import SimpleLexer
 
         session: PromptSession[str] = PromptSession(
             history=self.prompt_history,
@@ -276,9 +612,10 @@ class Prompter:
             enable_history_search=True,
             lexer=SimpleLexer(),
             vi_mode=self.use_vi_mode,
-            bottom_toolbar=self.bottom_toolbar,
             rprompt=self.rprompt,
-            completer=self.completer,
+            # completers are looked up on every completion as background fetch can swap them while typing
+            completer=DynamicCompleter(self._current_completer),
+            refresh_interval=TOOLBAR_REFRESH_INTERVAL,
         )
         while True:
             if start_in_embed:
@@ -286,12 +623,14 @@ class Prompter:
                 start_in_embed = False
             # XXX: is this the only way to change history aside from initiating session in every loop?
             session.default_buffer.history = self.prompt_history
+            self.update_completers()
+            # prompt runs in its own thread; only renderers that support background fetch can be used from it
+            toolbar = (lambda: self.bottom_toolbar) if self.renderer.background_fetch else self.bottom_toolbar
             text = session.prompt(
                 "> ",
                 in_thread=True,
-                bottom_toolbar=self.bottom_toolbar,
+                bottom_toolbar=toolbar,
                 rprompt=self.rprompt,
-                completer=self.completer,
             )
             text = text.replace("\\n", "\n")
             log.debug(f"got line input: {text!r}")
@@ -304,10 +643,39 @@ class Prompter:
                 continue
             result, meta = self.readline(text)
             log.debug(f"processed line input to: {result!r} with meta {meta!r}")
-            self.console.print("" if result is None else result)
+            if result is None:
+                self.print_result(result)
+            else:
+                with self.timings.phase("render"):
+                    self.print_result(result, limit=self.warn_limit)
             if result:
                 self.output_history.append(result)
 
+    def print_result(self, result: Any, limit: Optional[int] = None, plain: bool = False):
+        """
+        print result; long lists are streamed line by line instead of being rendered by rich at once
+        and only first `limit` of their values are printed unless pager is enabled
+        plain output of one-shot runs is printed without rich, lists of any size as their repr on a single line
+        """
+        if plain:
+            if isinstance(result, list):
+                write_lines(iter_repr(result), partial(click.echo, nl=False))
+            else:
+                click.echo("" if result is None else result)
+            return
+        if not isinstance(result, list) or len(result) <= STREAM_SIZE:
+            if not self.use_color:
+                click.echo("" if result is None else result if isinstance(result, str) else pformat(result))
+                return
+            self.console.print("" if result is None else result)
+            return
+        if self.use_pager:
+            click.echo_via_pager(iter_lines(result))
+            return
+        write_lines(iter_lines(result, limit=limit), partial(click.echo, nl=False))
+        if limit is not None and len(result) > limit:
+            echo(f"printed {limit} of {len(result)} values; use --pager to see all of them")
+
     def readline(self, text: str) -> str:  # pylint: disable=R0912
         """
         read single input line and do one/many of following:
@@ -340,10 +708,7 @@ class Prompter:
                         self.cmd.commands[name](value)
                 elif name in self.processors:
                     log.debug(f"found inline processor {name!r}")
-                    if value is True:
-                        _inline_processors.append(self.processors[name]())
-                    else:
-                        _inline_processors.append(self.processors[name](value))
+                    _inline_processors.append(self.create_processor(name, value))
 
             # enable temporary processors
             if _inline_processors:
@@ -361,9 +726,32 @@ class Prompter:
                 return None, {}
             # no processors and no remainder -> single command run
             elif not remainder:
+                if self.prefetch_next:
+                    self.prefetch_next = False
+                    self.prefetch(self.output_history[-1] if self.output_history else [])
                 return None, {}
             # otherwise have remainder but no processors -> false positive, the whole string was just a selector
             else:
                 pass
 
-        return self.select(text, processors=processors)
+        if self.profile_next:
+            self.profile_next = False
+            result = self.profile(self.select, text, processors=processors)
+        else:
+            result = self.select(text, processors=processors)
+        if self.prefetch_next:
+            self.prefetch_next = False
+            self.prefetch(result[0] or [])
+        return result
+
+    def profile(self, func, *args, **kwargs):
+        """call func under profiler and print functions it spent most cumulative time in"""
+        import cProfile
+        import pstats
+
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            stats = pstats.Stats(profiler, stream=sys.stderr)
+            stats.strip_dirs().sort_stats("cumulative").print_stats(PROFILE_FRAMES)
@@ -0,0 +1,53 @@
+"""
+contains documents kept open in the prompt as tabs
+"""
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from requests import Response
+
+
+class Tab:
+    """
+    document open in the prompt: its response, documents derived from it (e.g. parsed selector)
+    and completers, so switching to it needs no fetching or parsing
+    current tab's document lives in renderer; these are only filled when tab is loaded in background or left
+    """
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.response: Optional["Response"] = None
+        self.documents: Dict[str, Any] = {}
+        self.completers: Optional[Tuple[Any, Any]] = None
+        self.error: Optional[str] = None
+        self.started = time.perf_counter()
+        # seconds it took to fetch, parse and create completers
+        self.elapsed: Optional[float] = None
+
+    def loaded(self, response: "Response", documents: Dict[str, Any], completers: Tuple[Any, Any]):
+        """fill tab with loaded document; response is set last as it marks tab ready"""
+        self.documents = documents
+        self.completers = completers
+        self.elapsed = time.perf_counter() - self.started
+        self.response = response
+
+    def failed(self, error: str):
+        self.elapsed = time.perf_counter() - self.started
+        self.error = error
+
+    @property
+    def status(self) -> str:
+        if self.error:
+            return "failed"
+        if self.response is None:
+            return "loading"
+        return "ready"
+
+    @property
+    def title(self) -> str:
+        """url of tab's document; can differ from requested one, e.g. after redirects"""
+        return self.response.url if self.response is not None else self.url
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.title!r}, {self.status})"
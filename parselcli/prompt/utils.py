@@ -1,14 +1,60 @@
-from parselcli.prompt.completer import CSS_COMPLETION, XPATH_COMPLETION
+from collections import Counter
+from typing import List, NamedTuple
 
+from parsel import Selector
 
-def find_attributes(sel, attr):
+XPATH_COMPLETION = [
+    "text()",
+    "contains(",
+    "re:test(",
+    "following-sibling(",
+    "position()",
+    "last()",
+]
+CSS_COMPLETION = ["::text", "::attr("]
+
+
+class Vocabulary(NamedTuple):
+    """completion vocabulary of a document: node names, classes and ids with their occurrence counts"""
+
+    nodes: Counter
+    classes: Counter
+    ids: Counter
+
+    def css(self) -> Counter:
+        """css completion items with their counts"""
+        counts = Counter(self.nodes)
+        counts.update({"." + name: count for name, count in self.classes.items()})
+        counts.update({"#" + name: count for name, count in self.ids.items()})
+        return counts
+
+    def xpath(self) -> Counter:
+        """xpath completion items with their counts"""
+        return Counter(self.nodes)
+
+
+def find_vocabulary(sel: Selector) -> Vocabulary:
     """
-    finds node attributes in a selector
-    returns list of unique strings
+    finds node names, classes and ids in a selector
+    in a single pass through lxml tree
     """
-    classes = sel.xpath(f"//*/@{attr}").extract()
-    classes = [c.strip() for cs in classes for c in cs.split()]
-    return list(set(classes))
+    nodes, classes, ids = Counter(), Counter(), Counter()
+    for node in sel.root.iter():
+        tag = node.tag
+        if not isinstance(tag, str):  # comments and processing instructions
+            continue
+        if tag[0] == "{":  # namespaced xml node
+            tag = tag.split("}", 1)[1]
+            if node.prefix:
+                tag = f"{node.prefix}:{tag}"
+        nodes[tag] += 1
+        class_ = node.get("class")
+        if class_:
+            classes.update(class_.split())
+        id_ = node.get("id")
+        if id_:
+            ids.update(id_.split())
+    return Vocabulary(nodes, classes, ids)
 
 
 def find_nodes(sel):
@@ -16,20 +62,14 @@ def find_nodes(sel):
     Finds node names in a selector
     :returns list of unique strings
     """
-    nodes = sel.xpath("//*")
-    nodes = [n.xpath("name()").extract_first() for n in nodes]
-    return list(set(nodes))
+    return list(find_vocabulary(sel).nodes)
 
 
-def get_css_completion(sel):
-    """generates completion items for css from a selector"""
-    node_names = find_nodes(sel)
-    classes = ["." + c for c in find_attributes(sel, "class")]
-    ids = ["#" + c for c in find_attributes(sel, "id")]
-    return node_names + classes + ids + CSS_COMPLETION
+def get_css_completion(vocabulary: Vocabulary) -> List[str]:
+    """generates completion items for css from vocabulary of a document"""
+    return list(vocabulary.css()) + CSS_COMPLETION
 
 
-def get_xpath_completion(sel):
-    """generates completion items for xpath from a selector"""
-    completion = find_nodes(sel)
-    return completion + XPATH_COMPLETION
+def get_xpath_completion(vocabulary: Vocabulary) -> List[str]:
+    """generates completion items for xpath from vocabulary of a document"""
+    return list(vocabulary.xpath()) + XPATH_COMPLETION
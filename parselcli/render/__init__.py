@@ -1,35 +1,140 @@
+from collections import Counter
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
 from parsel import Selector
-from typing import Optional, Dict
-from requests import Response
-from parselcli.prompt.completer import CSS_COMPLETION, XPATH_COMPLETION, MiddleWordCompleter
-from loguru import logger as log
+
+from parselcli.selectors import CACHE, SelectorCache, evaluate, extract
+from parselcli.timings import NO_TIMINGS, Timings
+
+if TYPE_CHECKING:
+    from requests import Response
 
 
 class Renderer:
     """http render backend"""
 
+    # whether documents can be retrieved with `prepare` from other threads while current one is in use;
+    # renderers that can implement `fetch(url)`, which retrieves a response without switching to it
+    background_fetch = False
+
     def __init__(self, headers: Optional[Dict[str, str]] = None, **kwargs) -> None:
-        self._response: Optional[Response] = None
+        self._response: Optional["Response"] = None
         self.headers = headers
         self.kwargs = kwargs
+        # documents derived from current response (e.g. parsed selector) live here until response changes
+        self._documents: Dict[str, Any] = {}
+        self.version = 0
+        # changes of document other than mutations of current one, e.g. navigation to other url
+        self.loads = 0
+        self.cache_stats = Counter()
 
     @property
-    def response(self) -> Response:
+    def response(self) -> "Response":
         return self._response
 
     @property
     def content(self) -> str:
         return self.response.text
 
+    @property
+    def size(self) -> int:
+        """size of current content in bytes"""
+        return len(self.response.content) if self.response is not None else 0
+
+    def cached(self, key: str, factory: Callable[[], Any]) -> Any:
+        """
+        return document value of current response stored under key;
+        factory is called to create the value on first access
+        """
+        if key in self._documents:
+            self.cache_stats[f"{key} hits"] += 1
+            return self._documents[key]
+        version = self.version
+        value = factory()
+        self.cache_stats[f"{key} misses"] += 1
+        # response might have changed while value was being created
+        if version == self.version:
+            self._documents[key] = value
+        return value
+
+    def invalidate(self, mutation: bool = False):
+        """
+        drop all documents of current response; has to be called whenever response changes
+        mutation tells that current document was only changed in place (e.g. by javascript) rather than replaced
+        """
+        self._documents = {}
+        self.version += 1
+        if not mutation:
+            self.loads += 1
+
+    def refresh(self):
+        """drop all documents of current response so they are created again from current content"""
+        self.invalidate()
+
+    def parse(self, response: Optional["Response"] = None) -> Selector:
+        """parse current content or given response to selector"""
+        if response is None:
+            return Selector(text=self.content)
+        return Selector(text=response.text)
+
     @property
     def selector(self) -> Selector:
-        return Selector(text=self.content)
+        return self.cached("selector", self.parse)
 
     sel = selector
 
-    def goto(self, url, **kwargs) -> Response:
+    def evaluate(
+        self, query: str, mode: str = "css", cache: SelectorCache = CACHE, timings: Timings = NO_TIMINGS
+    ) -> Tuple[List[Any], Callable[[Any], str]]:
+        """
+        evaluate css or xpath query against current document
+        returns raw results and function that serializes a single result to string
+        """
+        with timings.phase("parse"):
+            selector = self.selector
+        results = evaluate(selector, query, mode=mode, cache=cache, timings=timings)
+        return results, partial(extract, type=selector.type)
+
+    def select(self, query: str, mode: str = "css", cache: SelectorCache = CACHE) -> List[str]:
+        """evaluate css or xpath query against current document and return extracted values"""
+        results, extract_result = self.evaluate(query, mode=mode, cache=cache)
+        return [extract_result(result) for result in results]
+
+    def goto(self, url, **kwargs) -> "Response":
         return
 
+    def create_document(self, response: "Response", key: str, factory: Callable[[], Any]) -> Any:
+        """create document of response stored under key; renderers can load persisted documents here instead"""
+        return factory()
+
+    def prepare(
+        self, url: str, fetch: Optional[Callable[[str], "Response"]] = None, **factories: Callable[[Selector], Any]
+    ) -> Tuple["Response", Dict[str, Any]]:
+        """
+        retrieve and parse url without changing current response, so it can be done in background
+        and `load`ed once ready; factories create other documents (e.g. completion vocabulary) from parsed selector
+        url is retrieved with `fetch` if given (e.g. by a FetchPool) instead of renderer's own fetch,
+        which only renderers supporting `background_fetch` have
+        returns response and its documents
+        """
+        response = (fetch or self.fetch)(url)
+        selector = self.parse(response)
+        documents = {"selector": selector}
+        for key, factory in factories.items():
+            documents[key] = self.create_document(response, key, partial(factory, selector))
+        return response, documents
+
+    def snapshot(self) -> Tuple["Response", Dict[str, Any]]:
+        """current response and its documents, so they can be `load`ed back later without parsing again"""
+        return self.response, dict(self._documents)
+
+    def load(self, response: "Response", documents: Optional[Dict[str, Any]] = None):
+        """switch to response; documents already created for it (e.g. by `prepare`) are kept"""
+        self._response = response
+        self.invalidate()
+        self._documents.update(documents or {})
+
     def open(self):
         pass
 
@@ -1,7 +1,14 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from fnmatch import fnmatch
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
 from parselcli.render import Renderer
-from typing import Optional, Dict
 
 try:
+    from playwright.async_api import async_playwright
     from playwright.sync_api import sync_playwright
     from playwright.sync_api._generated import Browser, Page, Playwright
 
@@ -9,37 +16,131 @@ try:
 except ImportError:
     PW_SUPPORTED = False
 
+from parsel import Selector
 from requests import Response
 from loguru import logger as log
 
+from parselcli.render.memory import create_response
+from parselcli.selectors import CACHE, SelectorCache, translate
+from parselcli.timings import NO_TIMINGS, Timings
+from parselcli.utils import ordered_imap
+
+PW_MISSING = (
+    "to use Playwright rendering Playwright is required; use `pip install parsel[browser]` "
+    "instead of `pip install parsel`"
+)
+# resource types browser pool doesn't load by default
+BLOCKED_RESOURCES = ("image", "font", "media")
+
+# keeps count of DOM mutations in the page so unchanged DOM snapshots can be reused
+DOM_VERSION_SCRIPT = """
+window.__parselDomVersion = 0;
+new MutationObserver(() => { window.__parselDomVersion += 1; }).observe(
+    document, {subtree: true, childList: true, attributes: true, characterData: true}
+);
+"""
+
+# evaluates css or xpath query in the page and serializes matched nodes the same way lxml does
+EVALUATE_SCRIPT = """
+([query, isXpath]) => {
+    const serialize = (node) => {
+        switch (node.nodeType) {
+            case Node.ELEMENT_NODE: return node.outerHTML;
+            case Node.DOCUMENT_NODE: return node.documentElement.outerHTML;
+            case Node.COMMENT_NODE: return `<!--${node.data}-->`;
+            default: return node.nodeValue;  // text and attribute nodes
+        }
+    };
+    if (!isXpath) {
+        return Array.from(document.querySelectorAll(query), serialize);
+    }
+    const result = document.evaluate(query, document.documentElement, null, XPathResult.ANY_TYPE, null);
+    switch (result.resultType) {
+        case XPathResult.NUMBER_TYPE: return [result.numberValue];
+        case XPathResult.STRING_TYPE: return [result.stringValue];
+        case XPathResult.BOOLEAN_TYPE: return [result.booleanValue];
+    }
+    const values = [];
+    for (let node = result.iterateNext(); node; node = result.iterateNext()) {
+        values.push(serialize(node));
+    }
+    return values;
+}
+"""
+
 
 class PlaywrightRenderer(Renderer):
     def __init__(self, headers: Optional[Dict[str, str]] = None, **kwargs) -> None:
         if not PW_SUPPORTED:
-            raise ImportError(
-                "to use Playwright rendering Playwright is required; use `pip install parsel[browser]` "
-                "instead of `pip install parsel`"
-            )
+            raise ImportError(PW_MISSING)
         super().__init__(headers=headers, **kwargs)
         self.pw: Optional[Playwright] = None
         self.browser: Optional[Browser] = None
         self.page: Optional[Page] = None
         self.browser_kwargs = kwargs.get("browser_kwargs", {})
+        # evaluate selectors in the page rather than in parsed snapshot of page's html
+        self.evaluate_in_page = kwargs.get("evaluate_in_page", False)
+        self._dom_state = None
+        # status of the last navigation; page itself doesn't keep it
+        self.status = 200
+
+    def sync(self):
+        """drop cached DOM snapshot and documents if page has navigated or its DOM has changed since"""
+        state = (self.page.url, self.page.evaluate("window.__parselDomVersion"))
+        if state != self._dom_state:
+            log.debug(f"page state changed to {state}; dropping cached documents")
+            mutation = self._dom_state is not None and self._dom_state[0] == state[0]
+            self._dom_state = state
+            self.invalidate(mutation=mutation)
+
+    def refresh(self):
+        self._dom_state = None
+        super().refresh()
 
     @property
     def content(self):
-        return self.page.content()
+        self.sync()
+        return self.cached("content", self.page.content)
+
+    @property
+    def selector(self) -> Selector:
+        self.sync()
+        return self.cached("selector", self.parse)
 
     @property
     def response(self) -> Response:
-        resp = Response()
-        resp.url = self.page.url
-        resp.status_code = 200
-        resp._content = self.content.encode()
-        # TODO this can be more sophisticated
-        return resp
-        # self._response = resp
-        # return response
+        """response describing current page; its body is left empty as page content is read through `content`"""
+        self.sync()
+        return self.cached("response", lambda: create_response(self.page.url, b"", status_code=self.status))
+
+    @property
+    def size(self) -> int:
+        return len(self.content.encode())
+
+    def evaluate(
+        self, query: str, mode: str = "css", cache: SelectorCache = CACHE, timings: Timings = NO_TIMINGS
+    ) -> Tuple[List[Any], Callable[[Any], str]]:
+        if not self.evaluate_in_page:
+            return super().evaluate(query, mode=mode, cache=cache, timings=timings)
+        if mode == "css" and "::" in query:
+            # browsers don't know parsel's ::text and ::attr() pseudo elements
+            with timings.phase("translate"):
+                query, mode = translate(query), "xpath"
+        with timings.phase("evaluate"):
+            values = self.page.evaluate(EVALUATE_SCRIPT, [query, mode == "xpath"])
+        # values are serialized in the page already
+        return [self._extract(value) for value in values], str
+
+    @staticmethod
+    def _extract(value) -> str:
+        """convert in-page value to string the same way lxml results are"""
+        if value is True:
+            return "1"
+        if value is False:
+            return "0"
+        if isinstance(value, (int, float)):
+            return str(float(value))
+        return value
 
     def open(self):
         self._pw_ctx = sync_playwright()
@@ -47,12 +148,172 @@ class PlaywrightRenderer(Renderer):
         log.debug(f"launching chromium browser with kwargs: {self.browser_kwargs}")
         self.browser = self.pw.chromium.launch(**self.browser_kwargs)
         self.page = self.browser.new_page()
+        self.page.add_init_script(DOM_VERSION_SCRIPT)
 
     def close(self):
         self._pw_ctx.__exit__()
 
     def goto(self, url, wait_for_load="domcontentloaded") -> Response:
-        self.page.goto(url)
+        response = self.page.goto(url)
+        self.status = response.status if response is not None else 200
         self.page.wait_for_load_state(wait_for_load)
-        # self._response = None
-        # self._sel = None
+        self.refresh()
+
+
+def site(url: str) -> str:
+    """site of url, roughly its host without subdomains, e.g. cdn.example.com -> example.com"""
+    host = urlparse(url).hostname or ""
+    return ".".join(host.split(".")[-2:])
+
+
+def should_block(
+    url: str,
+    resource_type: str,
+    page_url: str,
+    resource_types: Sequence[str] = BLOCKED_RESOURCES,
+    patterns: Sequence[str] = (),
+    third_party_scripts: bool = True,
+) -> bool:
+    """whether browser request of url made by page at page_url should be aborted"""
+    if resource_type == "document":
+        return False
+    if resource_type in resource_types:
+        return True
+    if third_party_scripts and resource_type == "script" and page_url.startswith("http"):
+        if site(url) != site(page_url):
+            return True
+    return any(fnmatch(url, pattern) for pattern in patterns)
+
+
+class BrowserPool:
+    """
+    Pool of browser pages for rendering many urls concurrently.
+    Playwright's async api runs in its own event loop thread and every page lives in a separate browser context.
+    Requests for images, fonts, media, third-party scripts and urls matching block patterns are aborted.
+    Instead of launching chromium the pool can connect to an already running browser (chrome devtools
+    http endpoint or ws endpoint of `playwright run-server`) so browser startup is shared across runs.
+    """
+
+    def __init__(
+        self,
+        size: int = 4,
+        headers: Optional[Dict[str, str]] = None,
+        browser_kwargs: Optional[Dict] = None,
+        connect: Optional[str] = None,
+        block: Sequence[str] = BLOCKED_RESOURCES,
+        block_patterns: Sequence[str] = (),
+        block_third_party_scripts: bool = True,
+        wait_for_load: str = "domcontentloaded",
+    ) -> None:
+        if not PW_SUPPORTED:
+            raise ImportError(PW_MISSING)
+        self.size = size
+        self.headers = headers or {}
+        self.browser_kwargs = browser_kwargs or {}
+        self.connect = connect
+        self.block = block
+        self.block_patterns = block_patterns
+        self.block_third_party_scripts = block_third_party_scripts
+        self.wait_for_load = wait_for_load
+        self.browser = None
+        self._pw = None
+        self._contexts = []
+        self._pages: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _run(self, coro):
+        """run coroutine in pool's event loop and wait for its result"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _open(self):
+        self._pw = await async_playwright().start()
+        if self.connect and self.connect.startswith("ws"):
+            log.debug(f"connecting to browser server at {self.connect}")
+            self.browser = await self._pw.chromium.connect(self.connect)
+        elif self.connect:
+            log.debug(f"connecting to browser over devtools protocol at {self.connect}")
+            self.browser = await self._pw.chromium.connect_over_cdp(self.connect)
+        else:
+            log.debug(f"launching chromium browser with kwargs: {self.browser_kwargs}")
+            self.browser = await self._pw.chromium.launch(**self.browser_kwargs)
+        self._pages = asyncio.Queue()
+        for _ in range(self.size):
+            context = await self.browser.new_context(extra_http_headers=self.headers)
+            await context.route("**/*", self._route)
+            self._contexts.append(context)
+            self._pages.put_nowait(await context.new_page())
+
+    async def _route(self, route):
+        request = route.request
+        try:
+            page_url = request.frame.url
+        except Exception:  # pylint: disable=W0703
+            page_url = ""  # e.g. service worker requests have no frame
+        blocked = should_block(
+            request.url,
+            request.resource_type,
+            page_url,
+            resource_types=self.block,
+            patterns=self.block_patterns,
+            third_party_scripts=self.block_third_party_scripts,
+        )
+        if blocked:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _render(self, url: str) -> Response:
+        page = await self._pages.get()
+        try:
+            response = await page.goto(url, wait_until=self.wait_for_load)
+            content = await page.content()
+            status = response.status if response is not None else 200
+            return create_response(page.url, content.encode(), status_code=status)
+        finally:
+            self._pages.put_nowait(page)
+
+    def fetch(self, url: str) -> Response:
+        """render url in one of free pages; blocks until a page is free and url is rendered"""
+        return self._run(self._render(url))
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """run callable in pool"""
+        return self._executor.submit(fn, *args)
+
+    def imap(self, items: Iterable[str], fetch: Callable = None) -> Iterator[Tuple[str, Future]]:
+        """
+        render items concurrently while keeping only a bounded amount in flight
+        yields (item, future) pairs in order items were given
+        """
+        fetch = fetch or self.fetch
+        return ordered_imap(lambda item: self.submit(fetch, item), items, window=self.size * 2)
+
+    async def _close(self):
+        for context in self._contexts:
+            await context.close()
+        if not self.connect:
+            await self.browser.close()
+        await self._pw.stop()
+
+    def open(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="browser-pool", daemon=True)
+        self._thread.start()
+        self._run(self._open())
+        self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="render")
+
+    def close(self):
+        self._executor.shutdown()
+        self._run(self._close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from loguru import logger as log
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+from parselcli.render.memory import create_response
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    response_url TEXT,
+    status INTEGER,
+    headers TEXT,
+    encoding TEXT,
+    body TEXT,
+    created REAL,
+    accessed REAL
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    size INTEGER
+);
+"""
+
+
+class BodyStore:
+    """
+    Persistent http response cache.
+    Bodies are stored as compressed blobs named by their content hash, so identical bodies are only stored once,
+    and responses are indexed by url in a small sqlite table. Other documents derived from a body
+    (e.g. completion vocabulary) can be stored next to it.
+    Least recently used responses are evicted once blobs take up more than max_size bytes.
+    """
+
+    def __init__(self, directory: Union[str, Path], max_size: int = 1024**3, expire: float = -1) -> None:
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self.expire = expire
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            (self.directory / "blobs").mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.directory / "index.sqlite"), timeout=30, check_same_thread=False)
+            self._db.executescript(SCHEMA)
+        return self._db
+
+    def blob_path(self, body_hash: str, name: str = "body") -> Path:
+        """path of a blob stored for body hash"""
+        return self.directory / "blobs" / body_hash[:2] / f"{body_hash}.{name}"
+
+    def _write(self, path: Path, data: bytes):
+        """write file atomically so concurrent readers never see partial blobs"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def get(self, url: str) -> Optional[Response]:
+        """return cached response of url or None if it's not cached or has expired"""
+        with self._lock:
+            row = self.db.execute(
+                "SELECT response_url, status, headers, encoding, body, created FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        response_url, status, headers, encoding, body_hash, created = row
+        if self.expire >= 0 and time.time() - created > self.expire:
+            log.debug(f"cached response of {url} has expired")
+            return None
+        try:
+            body = zlib.decompress(self.blob_path(body_hash).read_bytes())
+        except (OSError, zlib.error):
+            log.warning(f"cached body of {url} is missing or broken")
+            return None
+        with self._lock, self.db:
+            self.db.execute("UPDATE responses SET accessed = ? WHERE url = ?", (time.time(), url))
+        response = create_response(response_url, body, status_code=status, encoding=encoding)
+        response.headers = CaseInsensitiveDict(json.loads(headers))
+        response.from_cache = True
+        response.body_hash = body_hash
+        return response
+
+    def put(self, url: str, response: Response):
+        """store response of url"""
+        body = response.content
+        body_hash = hashlib.sha1(body).hexdigest()
+        path = self.blob_path(body_hash)
+        if not path.exists():
+            self._write(path, zlib.compress(body))
+        now = time.time()
+        with self._lock, self.db:
+            self.db.execute(
+                "INSERT OR IGNORE INTO blobs (hash, size) VALUES (?, ?)", (body_hash, path.stat().st_size)
+            )
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    response.url,
+                    response.status_code,
+                    json.dumps(dict(response.headers)),
+                    response.encoding,
+                    body_hash,
+                    now,
+                    now,
+                ),
+            )
+        response.from_cache = False
+        response.body_hash = body_hash
+        self.evict()
+
+    def get_extra(self, body_hash: str, name: str) -> Any:
+        """return document stored next to body or None"""
+        try:
+            return pickle.loads(zlib.decompress(self.blob_path(body_hash, name).read_bytes()))
+        except (OSError, zlib.error, pickle.PickleError, EOFError):
+            return None
+
+    def put_extra(self, body_hash: str, name: str, value: Any):
+        """store document next to body"""
+        path = self.blob_path(body_hash, name)
+        data = zlib.compress(pickle.dumps(value))
+        self._write(path, data)
+        with self._lock, self.db:
+            self.db.execute("UPDATE blobs SET size = size + ? WHERE hash = ?", (len(data), body_hash))
+        self.evict()
+
+    @property
+    def size(self) -> int:
+        """total size of stored blobs in bytes"""
+        with self._lock:
+            return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def evict(self):
+        """remove least recently used responses and their blobs until store fits into max_size"""
+        if self.max_size < 0:
+            return
+        with self._lock, self.db:
+            total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            if total <= self.max_size:
+                return
+            rows = self.db.execute("SELECT url, body FROM responses ORDER BY accessed").fetchall()
+            sizes = dict(self.db.execute("SELECT hash, size FROM blobs"))
+            # blob is freed once the last response referring to it is evicted
+            references = Counter(body_hash for _, body_hash in rows)
+            total -= sum(size for body_hash, size in sizes.items() if not references[body_hash])
+            evicted = []
+            for url, body_hash in rows:
+                if total <= self.max_size:
+                    break
+                evicted.append((url,))
+                references[body_hash] -= 1
+                if not references[body_hash]:
+                    total -= sizes.get(body_hash, 0)
+            self.db.executemany("DELETE FROM responses WHERE url = ?", evicted)
+            orphans = self.db.execute(
+                "SELECT hash FROM blobs WHERE hash NOT IN (SELECT body FROM responses)"
+            ).fetchall()
+            for (body_hash,) in orphans:
+                for path in self.blob_path(body_hash).parent.glob(f"{body_hash}.*"):
+                    path.unlink()
+            self.db.execute("DELETE FROM blobs WHERE hash NOT IN (SELECT body FROM responses)")
+            log.debug(f"evicted {len(evicted)} responses, cache is down to {total} bytes")
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,153 @@
+import codecs
+import mmap
+import re
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Union
+from urllib.parse import unquote, urlparse
+
+from loguru import logger as log
+from lxml import etree, html
+from parsel import Selector
+
+from parselcli.render import Renderer
+from parselcli.render.memory import create_response
+
+if TYPE_CHECKING:
+    from requests import Response
+
+# size of chunks documents are fed to lxml parser in
+PARSE_CHUNK_SIZE = 1024 * 1024
+XML_SUFFIXES = (".xml", ".rss", ".atom")
+DOCUMENT_SUFFIXES = (".html", ".htm", ".xhtml", *XML_SUFFIXES)
+# leading bytes of a document searched for its declared charset
+SNIFF_SIZE = 4096
+CHARSET_RE = re.compile(rb"""<meta[^>]+charset=["']?([\w.:-]+)""", re.I)
+XML_ENCODING_RE = re.compile(rb"""^\s*<\?xml[^>]+encoding=["']([\w.:-]+)""", re.I)
+BOMS = ((codecs.BOM_UTF8, "utf-8"), (codecs.BOM_UTF16_LE, "utf-16-le"), (codecs.BOM_UTF16_BE, "utf-16-be"))
+
+
+def local_path(source: str) -> Optional[Path]:
+    """return path of source if it points to a local file or directory"""
+    if source.startswith("file://"):
+        return Path(unquote(urlparse(source).path))
+    if "://" in source:
+        return None
+    path = Path(source)
+    return path if path.exists() else None
+
+
+def document_files(directory: Path) -> List[Path]:
+    """html and xml documents found in directory"""
+    return sorted(path for path in directory.rglob("*") if path.suffix.lower() in DOCUMENT_SUFFIXES)
+
+
+def document_type(url: str) -> str:
+    """guess whether document at url is xml or html"""
+    return "xml" if urlparse(url).path.lower().endswith(XML_SUFFIXES) else "html"
+
+
+def sniff_encoding(body: Union[bytes, mmap.mmap], default: str = "utf-8") -> str:
+    """
+    encoding of a document that didn't come with http headers: byte order mark,
+    charset of <meta> tag or xml declaration, otherwise default
+
+    >>> sniff_encoding(b'<html><meta charset="iso-8859-1">caf\\xe9'), sniff_encoding(b"<p>foo</p>")
+    ('iso-8859-1', 'utf-8')
+    """
+    head = body[:SNIFF_SIZE]
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    match = XML_ENCODING_RE.search(head) or CHARSET_RE.search(head)
+    if match:
+        encoding = match.group(1).decode("ascii").lower()
+        try:
+            codecs.lookup(encoding)
+            return encoding
+        except LookupError:
+            log.debug(f"unknown declared encoding {encoding!r}; using {default}")
+    return default
+
+
+def map_file(path: Path) -> Union[mmap.mmap, bytes]:
+    """memory map file for reading"""
+    with open(path, "rb") as file:
+        try:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty files can't be mapped
+            return b""
+
+
+def parse_document(  # pylint: disable=W0622
+    body: Union[bytes, mmap.mmap], type: str = "html", encoding: str = "utf-8"
+) -> Selector:
+    """
+    parse bytes-like body to selector by feeding it to lxml parser in chunks,
+    so the document is never decoded to an intermediate string
+    """
+    parser_cls = etree.XMLParser if type == "xml" else html.HTMLParser
+    try:
+        parser = parser_cls(recover=True, encoding=encoding, huge_tree=True)
+    except LookupError:  # encoding unknown to lxml
+        return Selector(text=str(body, encoding, errors="replace"), type=type)
+    for start in range(0, len(body), PARSE_CHUNK_SIZE):
+        end = start + PARSE_CHUNK_SIZE
+        parser.feed(body[start:end])
+    root = parser.close() if len(body) else None
+    if root is None:
+        root = etree.fromstring(b"<html/>", parser=parser_cls(recover=True))
+    return Selector(root=root, type=type)
+
+
+class FileRenderer(Renderer):
+    """
+    local document render backend that supports file paths, file:// urls, directories and stdin ("-")
+    files are memory mapped rather than read to memory; maps are released once nothing (e.g. prompt tab)
+    references their responses anymore
+    """
+
+    background_fetch = True
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None, **kwargs) -> None:
+        super().__init__(headers, **kwargs)
+        self.files: List[Path] = []
+
+    @property
+    def type(self) -> str:  # pylint: disable=W0622
+        """document type of current response, html or xml"""
+        return document_type(self.response.url) if self.response is not None else "html"
+
+    def parse(self, response: Optional["Response"] = None) -> Selector:
+        response = response or self.response
+        # stdin ("-") has no suffix and is parsed as html
+        return parse_document(response.content, type=document_type(response.url), encoding=response.encoding)
+
+    def fetch(self, url: str) -> "Response":
+        """read document without changing current response; directories resolve to their first document"""
+        if url == "-":
+            log.debug("reading document from stdin")
+            body = sys.stdin.buffer.read()
+            return create_response(url, body, encoding=sniff_encoding(body))
+        path = local_path(url)
+        if path is None:
+            raise FileNotFoundError(f"no such file: {url}")
+        if path.is_dir():
+            files = document_files(path)
+            if not files:
+                raise FileNotFoundError(f"no html or xml documents in directory: {path}")
+            path = files[0]
+        body = map_file(path)
+        return create_response(path.absolute().as_uri(), body, encoding=sniff_encoding(body))
+
+    def goto(self, url: str, **kwargs) -> "Response":
+        path = local_path(url) if url != "-" else None
+        if path is not None and path.is_dir():
+            self.files = document_files(path)
+            log.debug(f"found {len(self.files)} documents in {path}")
+        self.load(self.fetch(url))
+        return self.response
+
+    def close(self):
+        if self._response is not None and isinstance(self._response.content, mmap.mmap):
+            self._response.content.close()
@@ -1,35 +1,170 @@
+import threading
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from requests import Response
+from requests.adapters import HTTPAdapter
 from requests.sessions import Session
-from requests_cache import CachedSession, ExpirationTime
+
 from parselcli.render import Renderer
-from typing import Optional, Dict
+from parselcli.render.cache import BodyStore
+from parselcli.utils import ordered_imap
 
 
 class HttpRenderer(Renderer):
+    background_fetch = True
+
     def __init__(self, headers: Optional[Dict[str, str]] = None, **kwargs) -> None:
         super().__init__(headers, **kwargs)
         self.session: Optional[Session] = None
         self.headers = headers or {}
+        # connections kept alive per host
+        self.pool_size = kwargs.get("pool_size", 10)
 
     @property
     def content(self):
         return self.response.text
 
+    def create_session(self) -> Session:
+        """create new http session with pooled connections"""
+        session = Session()
+        self.setup_session(session)
+        return session
+
+    def setup_session(self, session: Session):
+        """apply renderer's headers and connection pooling to a session"""
+        session.headers.update(**self.headers)
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
     def open(self):
-        self.session = Session()
-        self.session.headers.update(**self.headers)
+        self.session = self.create_session()
+
+    def fetch(self, url: str, session: Optional[Session] = None) -> Response:
+        """retrieve url without changing current response"""
+        return (session or self.session).get(url)
 
     def goto(self, url: str):
-        self._response = self.session.get(url)
-        self._sel = None
+        self.load(self.fetch(url))
 
 
 class CachedHttpRenderer(HttpRenderer):
+    """
+    http renderer that keeps successful responses in a persistent BodyStore;
+    persistent documents (like completion vocabulary) of cached responses are stored too
+    """
+
+    persistent_documents = ("vocabulary",)
+
     def __init__(
-        self, cache_file: str, cache_expire: ExpirationTime = -1, headers: Optional[Dict[str, str]] = None, **kwargs
+        self,
+        cache_dir: str,
+        cache_expire: float = -1,
+        headers: Optional[Dict[str, str]] = None,
+        cache_size: int = 1024**3,
+        **kwargs,
     ) -> None:
         super().__init__(headers, **kwargs)
-        self.cache_file = cache_file
-        self.cache_expire = cache_expire
+        self.store = BodyStore(cache_dir, max_size=cache_size, expire=cache_expire)
+
+    def fetch(self, url: str, session: Optional[Session] = None) -> Response:
+        response = self.store.get(url)
+        if response is not None:
+            return response
+        response = super().fetch(url, session=session)
+        # errors are likely temporary so they are retrieved again next time
+        if response.ok:
+            self.store.put(url, response)
+        return response
+
+    def create_document(self, response: Response, key: str, factory: Callable[[], Any]) -> Any:
+        body_hash = getattr(response, "body_hash", None)
+        if key not in self.persistent_documents or body_hash is None:
+            return factory()
+        value = self.store.get_extra(body_hash, key)
+        if value is None:
+            value = factory()
+            self.store.put_extra(body_hash, key, value)
+        return value
+
+    def cached(self, key: str, factory: Callable[[], Any]) -> Any:
+        response = self.response
+        return super().cached(key, lambda: self.create_document(response, key, factory))
+
+    def close(self):
+        self.store.close()
+
+
+class FetchPool:
+    """
+    Thread pool for retrieving many urls concurrently through renderer's sessions.
+    Every worker thread keeps its own keep-alive session and
+    amount of concurrent requests to a single host is limited by per_host.
+    Renderers without sessions (e.g. local files) are fetched directly.
+    """
+
+    def __init__(self, renderer: Renderer, concurrency: int = 8, per_host: int = 4) -> None:
+        self.renderer = renderer
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._local = threading.local()
+        # sessions of all threads, so they can be closed together with the pool
+        self._sessions: List[Session] = []
+        self._hosts_lock = threading.Lock()
+        self._hosts: Dict[str, threading.BoundedSemaphore] = defaultdict(
+            lambda: threading.BoundedSemaphore(self.per_host)
+        )
+
+    @property
+    def session(self) -> Session:
+        """session of current thread"""
+        if not hasattr(self._local, "session"):
+            self._local.session = self.renderer.create_session()
+            with self._hosts_lock:
+                self._sessions.append(self._local.session)
+        return self._local.session
+
+    def host_limit(self, url: str) -> threading.BoundedSemaphore:
+        """semaphore limiting concurrent requests to host of the url"""
+        with self._hosts_lock:
+            return self._hosts[urlparse(url).netloc]
+
+    def fetch(self, url: str) -> Response:
+        """retrieve url using current thread's session; blocks while host is at its connection limit"""
+        with self.host_limit(url):
+            if not isinstance(self.renderer, HttpRenderer):
+                return self.renderer.fetch(url)
+            return self.renderer.fetch(url, session=self.session)
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """run callable in pool"""
+        return self._executor.submit(fn, *args)
+
+    def imap(self, items: Iterable[str], fetch: Callable = None) -> Iterator[Tuple[str, Future]]:
+        """
+        retrieve items concurrently while keeping only a bounded amount in flight
+        yields (item, future) pairs in order items were given
+        """
+        fetch = fetch or self.fetch
+        return ordered_imap(lambda item: self.submit(fetch, item), items, window=self.concurrency * 2)
 
     def open(self):
-        self.session = CachedSession(self.cache_file, expire_after=self.cache_expire)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="fetch")
+
+    def close(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+        with self._hosts_lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -1,12 +1,27 @@
+from typing import TYPE_CHECKING
+
 from parselcli.render import Renderer
-from requests import Response
+
+if TYPE_CHECKING:
+    from requests import Response
+
+
+def create_response(url: str, body: bytes, status_code: int = 200, encoding: str = "utf-8") -> "Response":
+    """create response object for content that didn't come from http"""
+    # requests is slow to import so it's only imported once a response is needed
+    from requests import Response  # pylint: disable=C0415
+
+    resp = Response()
+    resp.url = url
+    resp._content = body
+    resp.status_code = status_code
+    resp.encoding = encoding
+    return resp
 
 
 class MemoryRenderer(Renderer):
-    def goto(self, url, **kwargs) -> Response:
-        resp = Response()
-        resp.url = url
-        resp._content = kwargs["content"].encode()
-        resp.status_code = 200
+    def goto(self, url, **kwargs) -> "Response":
+        resp = create_response(url, kwargs["content"].encode())
         self._response = resp
+        self.invalidate()
         return resp
@@ -0,0 +1,106 @@
+"""
+Contains selector evaluation functionality shared by interactive prompt and batch runs.
+Selectors are compiled to lxml xpath objects once and kept in a LRU cache.
+"""
+# pylint: disable=W0622
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from lxml import etree
+from parsel import Selector
+from parsel.csstranslator import GenericTranslator, HTMLTranslator
+
+from parselcli.timings import NO_TIMINGS, Timings
+
+TRANSLATORS = {"html": HTMLTranslator(), "xml": GenericTranslator()}
+
+
+class SelectorCache:
+    """
+    LRU cache of compiled xpath expressions keyed by mode, document type, namespaces and expression;
+    css expressions are translated to xpath only once too.
+    """
+
+    def __init__(self, maxsize: int = 256) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._compiled: "OrderedDict[tuple, etree.XPath]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def compile(
+        self, query: str, mode: str = "css", type: str = "html", namespaces: Optional[Dict[str, str]] = None
+    ) -> etree.XPath:
+        """return compiled xpath object of css or xpath query"""
+        key = (mode, type, query, tuple(sorted((namespaces or {}).items())))
+        with self._lock:
+            compiled = self._compiled.get(key)
+            if compiled is not None:
+                self.hits += 1
+                self._compiled.move_to_end(key)
+                return compiled
+        xpath = translate(query, type=type) if mode == "css" else query
+        compiled = etree.XPath(xpath, namespaces=namespaces, smart_strings=False)
+        with self._lock:
+            self.misses += 1
+            self._compiled[key] = compiled
+            if len(self._compiled) > self.maxsize:
+                self._compiled.popitem(last=False)
+        return compiled
+
+    def clear(self):
+        """drop all compiled expressions"""
+        with self._lock:
+            self._compiled.clear()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """cache size and hit/miss counts"""
+        return {"size": len(self._compiled), "hits": self.hits, "misses": self.misses}
+
+    def __len__(self) -> int:
+        return len(self._compiled)
+
+
+# cache shared by everything in current process
+CACHE = SelectorCache()
+
+
+def translate(query: str, type: str = "html") -> str:
+    """translate css query, including parsel's ::text and ::attr() pseudo elements, to xpath"""
+    return TRANSLATORS[type].css_to_xpath(query)
+
+
+def _xml_or_html(type: str) -> str:
+    return "xml" if type == "xml" else "html"
+
+
+def evaluate(
+    sel: Selector, query: str, mode: str = "css", cache: SelectorCache = CACHE, timings: Timings = NO_TIMINGS
+) -> List[Any]:
+    """evaluate css or xpath query against selector and return raw lxml results"""
+    type = _xml_or_html(sel.type)
+    with timings.phase("translate"):
+        compiled = cache.compile(query, mode=mode, type=type, namespaces=sel.namespaces)
+    with timings.phase("evaluate"):
+        result = compiled(sel.root)
+    if not isinstance(result, list):
+        return [result]
+    return result
+
+
+def extract(result: Any, type: str = "html") -> str:
+    """serialize single lxml result to string the same way parsel does"""
+    if isinstance(result, etree._Element):  # pylint: disable=W0212
+        return etree.tostring(result, method=_xml_or_html(type), encoding="unicode", with_tail=False)
+    if result is True:
+        return "1"
+    if result is False:
+        return "0"
+    return str(result)
+
+
+def select(sel: Selector, query: str, mode: str = "css", cache: SelectorCache = CACHE) -> List[str]:
+    """evaluate css or xpath query against selector and return extracted values"""
+    return [extract(result, sel.type) for result in evaluate(sel, query, mode=mode, cache=cache)]
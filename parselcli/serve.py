@@ -0,0 +1,203 @@
+"""
+Contains long running server functionality:
+a local http (or unix socket) json api for evaluating selectors against urls or submitted documents
+while keeping sessions, parsed documents and compiled selectors warm between requests.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from socketserver import ThreadingMixIn, UnixStreamServer
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+from click import UsageError
+from loguru import logger as log
+from parsel import Selector
+from requests import Response
+
+from parselcli.batch import SelectorSpec, evaluate, parse_selector, retrieve
+from parselcli.render.file import document_type, parse_document, sniff_encoding
+from parselcli.render.http import FetchPool
+from parselcli.render.memory import create_response
+from parselcli.selectors import CACHE
+
+
+@lru_cache(maxsize=1024)
+def _spec(name: str, text: str, mode: str) -> SelectorSpec:
+    return parse_selector(name, text, mode=mode)
+
+
+class SelectorService:
+    """
+    Evaluates selector requests of the api.
+    Parsed documents are kept in a LRU cache keyed by url or by hash of submitted body,
+    so repeated requests against the same document skip fetching and parsing.
+
+    Request is a json object of:
+        url: document url or local file path
+        body: document source; url is then only used for resolving relative urls
+        type: "html" or "xml"; guessed from url by default
+        mode: default selector mode "css" or "xpath"
+        selectors: object of named selectors in prompt syntax, e.g. {"title": "h1::text --first"}
+        refresh: fetch and parse url again even if it's cached
+
+    Only http(s) urls are retrieved unless `allow_files` is set, as otherwise anyone who can reach the server
+    could read local files.
+    """
+
+    def __init__(self, pool: FetchPool, max_documents: int = 32, allow_files: bool = False) -> None:
+        self.pool = pool
+        self.max_documents = max_documents
+        self.allow_files = allow_files
+        self.stats = Counter()
+        self._documents: "OrderedDict[tuple, Tuple[Response, Selector]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # lxml documents are not safe to evaluate from many threads at once
+        self._evaluate_lock = threading.Lock()
+
+    def document(self, request: Dict) -> Tuple[Response, Selector]:
+        """return response and parsed selector of requested document"""
+        url = request.get("url") or "about:blank"
+        body = request.get("body")
+        type = request.get("type") or document_type(url)  # pylint: disable=W0622
+        if body is not None:
+            body = body.encode("utf-8")
+            key = ("body", url, type, hashlib.sha1(body).hexdigest())
+        else:
+            key = ("url", url, type)
+        with self._lock:
+            document = self._documents.get(key)
+            if document is not None and not request.get("refresh"):
+                self.stats["document hits"] += 1
+                self._documents.move_to_end(key)
+                return document
+        self.stats["document misses"] += 1
+        if body is not None:
+            response = create_response(url, body, encoding=sniff_encoding(body))
+        else:
+            response = retrieve(url, self.pool)
+        selector = parse_document(response.content, type=type, encoding=response.encoding or "utf-8")
+        # body is not needed once parsed; processors only need response url and status
+        document = create_response(response.url, b"", status_code=response.status_code), selector
+        with self._lock:
+            self._documents[key] = document
+            self._documents.move_to_end(key)
+            while len(self._documents) > self.max_documents:
+                self._documents.popitem(last=False)
+        return document
+
+    def select(self, request: Dict) -> Tuple[int, Dict]:
+        """evaluate request's selectors and return http status code and result"""
+        selectors = request.get("selectors")
+        if not isinstance(selectors, dict) or not selectors:
+            return 400, {"error": '"selectors" should be an object of named selectors'}
+        if request.get("body") is None:
+            if not request.get("url"):
+                return 400, {"error": 'request needs "url" or "body"'}
+            if not self.allow_files and urlparse(request["url"]).scheme not in ("http", "https"):
+                return 400, {
+                    "error": "only http(s) urls are allowed; local files need server started with --allow-files"
+                }
+        try:
+            specs = [_spec(name, text, request.get("mode", "css")) for name, text in selectors.items()]
+        except UsageError as exc:
+            return 400, {"error": exc.message}
+        try:
+            response, selector = self.document(request)
+        except Exception as exc:  # pylint: disable=W0703
+            log.error(f"failed to retrieve {request.get('url')}: {exc}")
+            return 502, {"error": f"{type(exc).__name__}: {exc}"}
+        with self._evaluate_lock:
+            data, errors = evaluate(selector, specs, response=response)
+        result = {"url": response.url, "status": response.status_code, "data": data}
+        if errors:
+            result["errors"] = errors
+        return 200, result
+
+    def info(self) -> Dict:
+        """cache statistics"""
+        return {
+            "documents": len(self._documents),
+            "document_hits": self.stats["document hits"],
+            "document_misses": self.stats["document misses"],
+            "selectors": CACHE.stats,
+        }
+
+
+class Handler(BaseHTTPRequestHandler):
+    """json api request handler: POST /select and GET /stats"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):  # pylint: disable=C0103
+        if self.path != "/select":
+            self.reply(404, {"error": f"no such endpoint: {self.path}"})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except ValueError as exc:
+            self.reply(400, {"error": f"invalid json: {exc}"})
+            return
+        if not isinstance(request, dict):
+            self.reply(400, {"error": "request should be a json object"})
+            return
+        self.reply(*self.server.service.select(request))
+
+    def do_GET(self):  # pylint: disable=C0103
+        if self.path != "/stats":
+            self.reply(404, {"error": f"no such endpoint: {self.path}"})
+            return
+        self.reply(200, self.server.service.info())
+
+    def reply(self, status: int, data: Dict):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        log.debug(format % args)
+
+
+class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    """http server listening on unix socket"""
+
+    daemon_threads = True
+
+
+def create_server(
+    service: SelectorService,
+    host: str = "127.0.0.1",
+    port: int = 8421,
+    socket_path: Optional[Union[str, Path]] = None,
+) -> Union[ThreadingHTTPServer, ThreadingUnixHTTPServer]:
+    """create api server on tcp host and port or on unix socket"""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)  # left over from previous run
+        server = ThreadingUnixHTTPServer(str(socket_path), Handler)
+    else:
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def serve(service: SelectorService, **kwargs):
+    """run api server until interrupted"""
+    server = create_server(service, **kwargs)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if kwargs.get("socket_path"):
+            os.unlink(kwargs["socket_path"])
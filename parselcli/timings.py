@@ -0,0 +1,61 @@
+"""
+Contains phase timing functionality that shows where time of a query went: fetching, parsing, translating css,
+evaluating, extracting, processing and rendering
+"""
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterable
+
+
+def format_duration(seconds: float) -> str:
+    """
+    format seconds to human readable units
+
+    >>> format_duration(0.0000123), format_duration(0.5), format_duration(12)
+    ('12.3us', '500.0ms', '12.00s')
+    """
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f}us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.1f}ms"
+    return f"{seconds:.2f}s"
+
+
+class Timings:
+    """durations of named phases in order they were recorded"""
+
+    def __init__(self) -> None:
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        """time block of code as phase `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    def reset(self, keep: Iterable[str] = ()):
+        """forget recorded phases except ones in keep"""
+        self.phases = {name: seconds for name, seconds in self.phases.items() if name in keep}
+
+    @property
+    def total(self) -> float:
+        return sum(self.phases.values())
+
+    def __bool__(self) -> bool:
+        return bool(self.phases)
+
+    def __str__(self) -> str:
+        return " ".join(f"{name} {format_duration(seconds)}" for name, seconds in self.phases.items())
+
+
+class NoTimings(Timings):
+    """timings that record nothing; default for code paths nobody is inspecting"""
+
+    def phase(self, name: str):
+        return nullcontext()
+
+
+NO_TIMINGS = NoTimings()
@@ -2,8 +2,11 @@
 Utility functions used by parselcli
 """
 # pylint: disable=I1101
+from collections import deque
 from copy import deepcopy
-from lxml import etree
+from html import escape
+
+from lxml import etree, html
 
 
 def lazy_dict_merge(root, update):
@@ -30,14 +33,126 @@ def lazy_dict_merge(root, update):
     return result
 
 
-def prettify_html_lxml(element):
-    """Prettify html by using lxml pretty_print functionality"""
-    parser = etree.HTMLParser(remove_blank_text=True)
-    as_node = etree.fromstring(element, parser)[0]  # remove <html> tag
-    result = etree.tostring(as_node, encoding="unicode", pretty_print=True)
-    # remove <body> wrapper
-    result = result.split("<body>", 1)[1].rsplit("</body>", 1)[0].strip()
-    result, *tail = result.rsplit("\n", 1)
-    if tail:
-        result += "\n" + tail[0].strip()
-    return result
+# tags whose content is output as is
+PREFORMATTED_TAGS = {"pre", "textarea"}
+VOID_TAGS = {
+    *("area", "base", "br", "col", "embed", "hr", "img", "input"),
+    *("link", "meta", "param", "source", "track", "wbr"),
+}
+
+
+class _SizeExceeded(Exception):
+    """raised once prettified output grows over its size limit"""
+
+
+def _tag_name(node) -> str:
+    name = etree.QName(node).localname
+    return f"{node.prefix}:{name}" if node.prefix else name
+
+
+def _attribute_name(name: str) -> str:
+    return etree.QName(name).localname if name.startswith("{") else name
+
+
+def prettify_html_lxml(element, indent=" ", max_size=None):
+    """
+    Prettify html element or html string the same way BeautifulSoup's prettify does:
+    every tag and text on its own line indented by depth.
+    Output is cut with "<...>" line once it's longer than max_size characters.
+
+    >>> print(prettify_html_lxml("<div><a href='/'>foo<br>bar</a></div>"))
+    <div>
+     <a href="/">
+      foo
+      <br/>
+      bar
+     </a>
+    </div>
+    """
+    is_fragment = isinstance(element, str)
+    if is_fragment:
+        nodes = html.fragments_fromstring(element)
+    else:
+        nodes = [element]
+    lines = []
+    size = 0
+
+    def add(depth, text):
+        nonlocal size
+        if max_size is not None and size > max_size:
+            raise _SizeExceeded
+        lines.append(indent * depth + text)
+        size += len(lines[-1]) + 1
+
+    def add_text(depth, text):
+        text = (text or "").strip()
+        if text:
+            add(depth, escape(text, quote=False))
+
+    def walk(node, depth):
+        if not isinstance(node.tag, str):  # comments and processing instructions
+            add(depth, etree.tostring(node, encoding="unicode", with_tail=False))
+            return
+        tag = _tag_name(node)
+        attrs = "".join(f' {_attribute_name(name)}="{escape(value)}"' for name, value in node.attrib.items())
+        if tag in PREFORMATTED_TAGS:
+            add(depth, etree.tostring(node, encoding="unicode", method="html", with_tail=False))
+            return
+        if tag in VOID_TAGS and not len(node) and not node.text:
+            add(depth, f"<{tag}{attrs}/>")
+            return
+        add(depth, f"<{tag}{attrs}>")
+        add_text(depth + 1, node.text)
+        for child in node:
+            walk(child, depth + 1)
+            add_text(depth + 1, child.tail)
+        add(depth, f"</{tag}>")
+
+    try:
+        for node in nodes:
+            if isinstance(node, str):  # leading text of html fragments
+                add_text(0, node)
+            else:
+                walk(node, 0)
+                # text between fragments; tail of element given directly isn't part of it
+                if is_fragment:
+                    add_text(0, node.tail)
+    except _SizeExceeded:
+        lines.append("<...>")
+    return "\n".join(lines)
+
+
+def ordered_imap(submit, items, window):
+    """
+    submit items lazily, keeping at most `window` of them in flight
+    and yield (item, future) pairs in the same order items were given
+
+    >>> from concurrent.futures import ThreadPoolExecutor
+    >>> with ThreadPoolExecutor() as pool:
+    ...     [future.result() for _, future in ordered_imap(lambda i: pool.submit(str, i), range(3), window=2)]
+    ['0', '1', '2']
+    """
+    pending = deque()
+    for item in items:
+        pending.append((item, submit(item)))
+        if len(pending) >= window:
+            yield pending.popleft()
+    while pending:
+        yield pending.popleft()
+
+
+def chunked(items, size):
+    """
+    split iterable to lists of given size
+
+    >>> list(chunked(range(5), 2))
+    [[0, 1], [2, 3], [4]]
+    """
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
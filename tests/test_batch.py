@@ -0,0 +1,116 @@
+import json
+
+import pytest
+from click import UsageError
+from click.testing import CliRunner
+
+from parselcli.batch import load_spec, parse_selector, run_batch, run_records
+from parselcli.cli import cli
+from parselcli.processors import First, Strip
+from parselcli.render.http import FetchPool, HttpRenderer
+
+HTML = '<h1> title </h1><a href="/foo">foo</a><a href="bar">bar</a>'
+
+
+def test_parse_selector():
+    spec = parse_selector("title", "h1::text --first --strip")
+    assert (spec.name, spec.query, spec.mode) == ("title", "h1::text", "css")
+    assert [type(p) for p in spec.processors] == [First, Strip]
+    spec = parse_selector("links", "//a/@href --xpath")
+    assert (spec.query, spec.mode, spec.processors) == ("//a/@href", "xpath", [])
+    with pytest.raises(UsageError):
+        parse_selector("bad", "h1 --fetch foo")
+    with pytest.raises(UsageError):
+        parse_selector("bad", "--first")
+
+
+def test_load_spec(tmp_path):
+    spec = tmp_path / "spec.toml"
+    spec.write_text('mode = "xpath"\n[selectors]\ntitle = "//h1/text()"\nlinks = "a::attr(href) --css"\n')
+    assert [(s.name, s.mode) for s in load_spec(spec)] == [("title", "xpath"), ("links", "css")]
+    spec = tmp_path / "spec.json"
+    spec.write_text(json.dumps({"title": "h1::text"}))
+    assert [(s.name, s.mode) for s in load_spec(spec)] == [("title", "css")]
+
+
+def test_run_batch(tmp_path):
+    page = tmp_path / "page.html"
+    page.write_text(HTML)
+    specs = [parse_selector("title", "h1::text -1 -s"), parse_selector("links", "a::attr(href) --absolute")]
+    with FetchPool(HttpRenderer(), concurrency=2) as pool:
+        results = list(run_batch(specs, [str(page), page.as_uri(), "http://"], pool))
+    expected = {"title": "title", "links": ["file:///foo", (tmp_path / "bar").as_uri()]}
+    assert results[0] == {"url": str(page), "status": 200, "data": expected}
+    assert results[1]["data"] == expected
+    assert "error" in results[2]
+
+
+def test_cli_batch(tmp_path):
+    page = tmp_path / "page.html"
+    page.write_text(HTML)
+    spec = tmp_path / "spec.toml"
+    spec.write_text('[selectors]\ntitle = "h1::text --first --strip"\nbroken = "//h1[ --xpath"\n')
+    result = CliRunner().invoke(
+        cli, ["batch", str(spec), "--config", str(tmp_path / "parsel.toml")], input=f"# comment\n{page}\n\n"
+    )
+    assert result.exit_code == 0, result.output
+    (line,) = result.stdout.splitlines()
+    line = json.loads(line)
+    assert line["data"] == {"title": "title", "broken": None}
+    assert "broken" in line["errors"]
+
+
+def test_run_batch_workers(tmp_path):
+    pages = []
+    for i in range(5):
+        page = tmp_path / f"page{i}.html"
+        page.write_text(f"<h1>{i}</h1>")
+        pages.append(str(page))
+    specs = [parse_selector("title", "h1::text --first")]
+    with FetchPool(HttpRenderer()) as pool:
+        results = list(run_batch(specs, pages + ["missing"], pool, workers=2, chunk_size=2))
+    assert [r["url"] for r in results] == pages + ["missing"]
+    assert [r["data"]["title"] for r in results[:-1]] == ["0", "1", "2", "3", "4"]
+    assert "error" in results[-1]
+
+
+def test_run_records(tmp_path):
+    import gzip
+
+    urls = "".join(f"<url><loc>/{i}</loc><priority>0.{i}</priority></url>" for i in range(3))
+    feed = f'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+    sitemap = tmp_path / "sitemap.xml"
+    sitemap.write_text(feed)
+    gzipped = tmp_path / "sitemap.xml.gz"
+    gzipped.write_bytes(gzip.compress(feed.encode()))
+    specs = [
+        parse_selector("loc", "//loc/text() --xpath --first --absolute"),
+        parse_selector("priority", "priority::text -1"),
+    ]
+    with FetchPool(HttpRenderer()) as pool:
+        results = list(run_records(specs, [str(sitemap), str(gzipped), "missing.xml"], pool, tag="url"))
+    # relative urls are resolved against source of records
+    expected = [{"loc": f"file:///{i}", "priority": f"0.{i}"} for i in range(3)]
+    assert [r["data"] for r in results[:3]] == expected
+    assert [r["record"] for r in results[:3]] == [0, 1, 2]
+    assert [r["data"] for r in results[3:6]] == expected
+    assert "error" in results[6]
+
+
+def test_run_records_streams_gzipped_url(tmp_path):
+    import gzip
+    from functools import partial
+    from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+    from threading import Thread
+
+    feed = "<urlset>" + "".join(f"<url><loc>/{i}</loc></url>" for i in range(3)) + "</urlset>"
+    (tmp_path / "sitemap.xml.gz").write_bytes(gzip.compress(feed.encode()))
+    handler = partial(SimpleHTTPRequestHandler, directory=str(tmp_path))
+    with ThreadingHTTPServer(("127.0.0.1", 0), handler) as server:
+        Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/sitemap.xml.gz"
+        specs = [parse_selector("loc", "loc::text --first --absolute")]
+        with FetchPool(HttpRenderer()) as pool:
+            results = list(run_records(specs, [url], pool, tag="url"))
+        server.shutdown()
+    assert [r["data"]["loc"] for r in results] == [url.replace("sitemap.xml.gz", str(i)) for i in range(3)]
@@ -0,0 +1,29 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+
+def _bench(tmp_path, *args) -> subprocess.CompletedProcess:
+    cmd = [sys.executable, "-m", "benchmarks", "--sizes", "4KB", "--repeat", "1", "--min-time", "0"]
+    cmd += ["--corpus-dir", str(tmp_path / "corpora"), *args]
+    return subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+
+
+def test_benchmarks_run_and_compare(tmp_path):
+    output = tmp_path / "results.json"
+    assert _bench(tmp_path, "-k", "process.strip", "-o", str(output)).returncode == 0
+    results = json.loads(output.read_text())
+    assert list(results["results"]) == ["process.strip [4KB]"]
+    assert results["meta"]["lxml"]
+
+    # baseline that is much faster than anything makes comparison fail
+    results["results"]["process.strip [4KB]"]["min"] = 1e-12
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(results))
+    process = _bench(tmp_path, "-k", "process.strip", "--baseline", str(baseline))
+    assert process.returncode == 1
+    assert "slower than baseline" in process.stderr
+    assert json.loads(process.stdout)["results"]
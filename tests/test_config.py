@@ -0,0 +1,29 @@
+import toml
+
+from parselcli import config as config_module
+from parselcli.config import DEFAULT_CONFIG, get_config
+
+
+def test_get_config_creates_default(tmp_path):
+    path = tmp_path / "dir" / "parsel.toml"
+    assert get_config(path) == DEFAULT_CONFIG
+    assert toml.loads(path.read_text()) == DEFAULT_CONFIG
+    # history files and cache directories are not created just by loading config
+    assert list(path.parent.iterdir()) == [path]
+
+
+def test_get_config_writes_only_missing_keys(tmp_path, monkeypatch):
+    path = tmp_path / "parsel.toml"
+    path.write_text('vi_mode = true\n[requests]\ncache_expire = 5\n')
+    config = get_config(path)
+    assert config["vi_mode"] is True
+    assert config["requests"]["cache_expire"] == 5
+    assert config["requests"]["headers"] == DEFAULT_CONFIG["requests"]["headers"]
+    assert toml.loads(path.read_text()) == config
+
+    # complete config is not written again
+    def fail(*args, **kwargs):
+        raise AssertionError("config should not be written")
+
+    monkeypatch.setattr(config_module, "write_config", fail)
+    assert get_config(path) == config
@@ -1,5 +1,6 @@
 import decimal
 import pytest
+from parsel import Selector
 from requests import Response
 from parselcli.processors import (
     AbsoluteUrl,
@@ -15,6 +16,8 @@ from parselcli.processors import (
     Repr,
     Slice,
     Unique,
+    Pipeline,
+    Fused,
 )
 
 
@@ -107,6 +110,23 @@ def test_FormatHtml():
     proc = FormatHtml()
     assert proc("<div><a><b>foo</b></a></div>") == ("<div>\n <a>\n  <b>\n   foo\n  </b>\n </a>\n</div>", {})
     assert proc(["<div><a><b>foo</b></a></div>"]) == (["<div>\n <a>\n  <b>\n   foo\n  </b>\n </a>\n</div>"], {})
+    # text between top level elements is kept
+    assert proc("<b>one</b> two <i>three</i> four") == ("<b>\n one\n</b>\ntwo\n<i>\n three\n</i>\nfour", {})
+
+
+def test_FormatHtml_formats_parsed_nodes():
+    sel = Selector(text="<div><a href='/x'>foo<br></a><pre> a\n b</pre></div>")
+    results = sel.root.xpath("//div")
+    expected = '<div>\n <a href="/x">\n  foo\n  <br/>\n </a>\n <pre> a\n b</pre>\n</div>'
+    values, _ = Pipeline([FormatHtml()]).process_results(results, lambda r: pytest.fail("serialized"))
+    assert values == [expected]
+    assert FormatHtml()(sel.css("div").get()) == (expected, {})
+
+
+def test_FormatHtml_max_size():
+    value, _ = FormatHtml(max_size=20)("<div>" + "<p>foo</p>" * 100 + "</div>")
+    assert len(value) < 60
+    assert value.endswith("<...>")
 
 
 def test_Sum():
@@ -125,3 +145,54 @@ def test_Unique():
     assert proc([1, 2, 3, 3, 3, 4]) == ([1, 2, 3, 4], {})
     assert proc([1, 3, 1, 1, 2, 4]) == ([1, 3, 2, 4], {})
     assert proc("some text") == ("some text", {})
+
+
+@pytest.mark.parametrize(
+    "processors",
+    [
+        [Strip(), Regex(r"(\d+)"), Unique()],
+        [Strip(), Regex(r"^/"), Strip(), AbsoluteUrl()],
+        [Regex(r"(\d)"), Strip(), First()],
+        [AbsoluteUrl(), Strip("/"), Join(",")],
+        [Strip(), Regex(r"(\d+)"), Collapse()],
+        [Unique(), Strip(), Len()],
+    ],
+)
+def test_Pipeline_matches_sequential(processors):
+    resp = Response()
+    resp.url = "http://example.com/a/"
+    resp.status_code = 200
+    for values in [[" 1 /", "a 22", " ", "/x 3", "a 22", "\n"], "  /b 4 ", [" 5 "]]:
+        expected = values
+        for processor in processors:
+            expected, _ = processor(expected, response=resp)
+        assert Pipeline(processors)(values, response=resp) == (expected, {})
+
+
+def test_Pipeline_fuses_element_processors():
+    strip, regex, unique, absolute = Strip(), Regex("a"), Unique(), AbsoluteUrl()
+    stages = Pipeline([strip, regex, unique, absolute]).stages
+    assert isinstance(stages[0], Fused) and stages[0].processors == [strip, regex]
+    assert stages[1:] == [unique, absolute]
+
+
+@pytest.mark.parametrize(
+    "processor, expected, extracted",
+    [
+        (First(), "1", 1),
+        (Nth(-2), "3", 1),
+        (Len(), "4", 0),
+        (Slice("1:3"), ["2", "3"], 2),
+        (Unique(), ["1", "2", "3", "4"], 4),
+    ],
+)
+def test_Pipeline_extracts_only_needed_results(processor, expected, extracted):
+    sel = Selector(text="<p>1</p><p>2</p><p>3</p><p>4</p>")
+    calls = []
+
+    def extract(result):
+        calls.append(result)
+        return result.xpath("string()")
+
+    assert Pipeline([processor]).process_results(sel.root.xpath("//p"), extract) == (expected, {})
+    assert len(calls) == extracted
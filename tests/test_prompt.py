@@ -1,6 +1,13 @@
+import threading
+import time
+
+from prompt_toolkit.completion import CompleteEvent
+from prompt_toolkit.document import Document
+
+from parselcli.prompt.completer import MiddleWordCompleter
+from parselcli.prompt.output import STREAM_SIZE, OutputHistory, iter_lines
 from parselcli.prompt.runner import Prompter
 from parselcli.render.memory import MemoryRenderer
-from parsel import Selector
 
 
 def _renderer(content: str, url="http://example.com"):
@@ -81,3 +88,276 @@ def test_Prompter_readline_with_dashes():
     assert result == ["text"]
     result, _ = p.readline("h1.class-with--dashes::text --first")
     assert result == "text"
+
+
+def test_Prompter_failed_processor_outputs_extracted_values(capsys):
+    p = Prompter(_renderer("<a>1</a><a>2</a>"))
+    # -n fails on raw results as there are only 2 of them
+    assert p.readline("a::text -n 5")[0] == ["1", "2"]
+    assert p.readline("a -n 5")[0] == ["<a>1</a>", "<a>2</a>"]
+    assert 'processor "Nth(5)" failed' in capsys.readouterr().err
+
+
+def test_Prompter_completers_created_once_per_document():
+    p = Prompter(_renderer('<div class="foo bar" id="baz"><h1 class="foo">text</h1></div>'))
+    completer = p.completer
+    assert {".foo", ".bar", "#baz", "div", "h1"}.issubset(completer.words)
+    assert p.vocabulary.classes["foo"] == 2
+    p.select("h1::text")
+    p.select("div")
+    assert p.completer is completer
+    p.renderer.goto("http://example.com", content="<p>text</p>")
+    p.select("p")
+    assert p.completer is not completer
+    assert "p" in p.completer.words
+
+
+def test_Prompter_completers_created_lazily(monkeypatch):
+    monkeypatch.setattr("parselcli.prompt.runner.LAZY_COMPLETION_SIZE", 0)
+    monkeypatch.setattr("parselcli.prompt.runner.Thread.start", lambda thread: thread.run())
+    p = Prompter(_renderer("<h1>text</h1>"))
+    assert "h1" in p.completer.words
+
+
+def test_Prompter_completers_of_mutating_document_rebuilt_after_interval(monkeypatch):
+    p = Prompter(_renderer("<h1>text</h1>"))
+    completer = p.completer
+    # document changed in place, e.g. by javascript, keeps its completers for a while
+    p.renderer.invalidate(mutation=True)
+    assert p.completer is completer
+    monkeypatch.setattr("parselcli.prompt.runner.COMPLETER_REFRESH_INTERVAL", 0)
+    assert p.completer is not completer
+
+
+def test_MiddleWordCompleter_find():
+    completer = MiddleWordCompleter(
+        [".item", ".item-price", ".Title", "div", "--first"],
+        frequencies={".item-price": 5, ".item": 1},
+        ignore_case=True,
+    )
+    # longest matching part goes first, then most frequent word
+    assert completer.find("div .ite") == [(".item-price", 4), (".item", 4)]
+    assert completer.find("--fi") == [("--first", 4)]
+    # original case is completed even when matching ignores case
+    assert completer.find("h1 .ti") == [(".Title", 3)]
+    # whole words are not completed again
+    assert completer.find("div") == []
+    assert completer.find("di") == [("div", 2)]
+    assert completer.find("xyz") == []
+    completer.max_results = 1
+    assert completer.find("div .ite") == [(".item-price", 4)]
+
+
+def test_iter_lines_matches_rich():
+    from rich.console import Console
+
+    values = [f"value {i}" for i in range(5)]
+    console = Console(width=20, soft_wrap=True, highlight=False, record=True)
+    with console.capture() as capture:
+        console.print(values)
+    assert "".join(iter_lines(values)) == capture.get()
+
+
+def test_Prompter_print_result_streams_long_lists(capfd):
+    p = Prompter(_renderer("<h1>text</h1>"))
+    values = [str(i) for i in range(STREAM_SIZE + 50)]
+    p.print_result(values, limit=STREAM_SIZE)
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert len(lines) == STREAM_SIZE + 3
+    assert lines[1] == "    '0',"
+    assert lines[-2] == "    ... 50 more"
+    assert f"printed {STREAM_SIZE} of {STREAM_SIZE + 50} values" in err
+    # without limit all values are printed
+    p.print_result(values)
+    assert capfd.readouterr().out.splitlines()[-2] == f"    '{STREAM_SIZE + 49}'"
+
+
+def test_Prompter_print_result_plain(capfd):
+    p = Prompter(_renderer("<h1>text</h1>"))
+    # lists are printed the same way regardless of their size
+    for values in (["a"], [str(i) for i in range(STREAM_SIZE + 50)]):
+        p.print_result(values, plain=True)
+        assert capfd.readouterr().out == repr(values) + "\n"
+    p.print_result("text", plain=True)
+    p.print_result(None, plain=True)
+    assert capfd.readouterr().out == "text\n\n"
+
+
+def test_OutputHistory_spills_to_disk():
+    history = OutputHistory(max_entries=2, max_bytes=100)
+    outputs = ["a", ["b", "c"], "x" * 200, "d", ["e"]]
+    for output in outputs:
+        history.append(output)
+    assert len(history) == 5
+    # only latest entries that fit in budget stay in memory
+    assert [value for value, _ in history._memory] == ["d", ["e"]]
+    assert list(history) == outputs
+    assert history[-1] == ["e"]
+    assert history[1:3] == outputs[1:3]
+    history.close()
+
+
+def test_OutputHistory_round_trips_and_rotates():
+    history = OutputHistory(max_entries=1, max_disk_bytes=200)
+    outputs = [("tuple", 1.5), {"n": 1}, b"bytes"] + [str(i) * 50 for i in range(10)]
+    for output in outputs:
+        history.append(output)
+    # oldest outputs are forgotten once disk budget is exceeded
+    assert len(history) < len(outputs)
+    kept = len(outputs) - len(history)
+    assert list(history) == outputs[kept:]
+    assert history._file.seek(0, 2) <= 200
+    history.close()
+
+    history = OutputHistory(max_entries=1)
+    for output in outputs[:3]:
+        history.append(output)
+    # values come back from disk with their types intact
+    assert list(history) == outputs[:3]
+    history.close()
+
+
+def test_Prompter_clipout_copies_last_output(monkeypatch):
+    import pyperclip
+
+    copied = []
+    monkeypatch.setattr(pyperclip, "copy", copied.append)
+    p = Prompter(_renderer("<h1>first</h1><h2>last</h2>"))
+    p.output_history.append(p.readline("h1::text")[0])
+    p.output_history.append(p.readline("h2::text")[0])
+    p.readline("--clipout")
+    assert copied == ["['last']"]
+
+
+def test_Prompter_timings_and_profile(capsys):
+    p = Prompter(_renderer("<h1>foobar</h1>"))
+    p.readline("h1::text --strip")
+    assert list(p.timings.phases) == ["parse", "translate", "evaluate", "extract", "process"]
+    assert "evaluate" in p.bottom_toolbar
+    p.cmd.cmd_info()
+    assert "Last query: parse" in capsys.readouterr().err
+
+    assert p.readline("h1::text --profile") == (["foobar"], {})
+    assert not p.profile_next
+    assert "function calls" in capsys.readouterr().err
+
+
+def test_Prompter_fetch_in_background(tmp_path):
+    from parselcli.render.file import FileRenderer
+
+    (tmp_path / "a.html").write_text("<h1>a</h1>")
+    (tmp_path / "b.html").write_text("<h2 class='second'>b</h2>")
+    fetching = threading.Event()
+
+    class SlowRenderer(FileRenderer):
+        def fetch(self, url):
+            if url.endswith("b.html"):
+                fetching.wait(5)
+            return super().fetch(url)
+
+    p = Prompter(SlowRenderer())
+    p.renderer.goto(str(tmp_path / "a.html"))
+    p.readline(f"--fetch {tmp_path / 'b.html'}")
+    assert "[fetching" in p.bottom_toolbar
+    # queries keep running against previous document until new one is ready
+    assert p.select("h1::text") == (["a"], {})
+    fetching.set()
+    _wait(lambda: not p.fetching)
+    assert p.select("h2::text") == (["b"], {})
+    assert "fetch" in p.timings.phases
+    assert any(c.text == ".second" for c in p.completer.get_completions(Document(".sec"), CompleteEvent()))
+
+    p.readline(f"--fetch {tmp_path / 'missing.html'}")
+    _wait(lambda: not p.fetching)
+    assert "failed to fetch" in p.bottom_toolbar
+    assert p.select("h2::text") == (["b"], {})
+
+
+def _wait(condition, timeout=5):
+    for _ in range(int(timeout / 0.02)):
+        if condition():
+            return
+        time.sleep(0.02)
+    raise AssertionError("timed out")
+
+
+def test_cli_initial_fetch_is_waited_for(tmp_path, monkeypatch):
+    from click.testing import CliRunner
+
+    from parselcli.cli import cli
+    from parselcli.render.file import FileRenderer
+
+    (tmp_path / "a.html").write_text("<h1>A</h1>")
+    (tmp_path / "b.html").write_text("<h1>B</h1>")
+    fetch = FileRenderer.fetch
+
+    def slow_fetch(self, url):
+        time.sleep(0.2)
+        return fetch(self, url)
+
+    monkeypatch.setattr(FileRenderer, "fetch", slow_fetch)
+    args = [str(tmp_path / "a.html"), "-i", f"--fetch {tmp_path / 'b.html'}", "-c", "h1::text"]
+    result = CliRunner().invoke(cli, args + ["--config", str(tmp_path / "parsel.toml")])
+    assert result.output.splitlines()[-1] == "['B']"
+
+
+def test_Prompter_prefetch_uses_fetch_pool():
+    from parselcli.render.http import HttpRenderer
+    from parselcli.render.memory import create_response
+
+    sessions = []
+
+    class FakeHttpRenderer(HttpRenderer):
+        def fetch(self, url, session=None):
+            sessions.append(session)
+            return create_response(url, b"<h1>page</h1>")
+
+    renderer = FakeHttpRenderer()
+    renderer.open()
+    renderer.load(create_response("http://example.com", b"<a href='http://example.com/1'>1</a>"))
+    p = Prompter(renderer)
+    p.prefetch([f"http://example.com/{i}" for i in range(3)])
+    _wait(lambda: all(tab.status != "loading" for tab in p.tabs))
+    assert [tab.status for tab in p.tabs] == ["ready"] * 4
+    # workers retrieve documents with their own sessions rather than renderer's shared one
+    assert sessions and renderer.session not in sessions and None not in sessions
+    p.close()
+
+
+def test_Prompter_tabs(tmp_path, capsys):
+    from parselcli.render.file import FileRenderer
+
+    for name in "abc":
+        (tmp_path / f"{name}.html").write_text(f"<h1 class='{name}-title'>{name}</h1>")
+    index = tmp_path / "index.html"
+    index.write_text("".join(f"<a href='{name}.html'>{name}</a>" for name in "abc") + "<a href='x'>x</a>")
+    renderer = FileRenderer()
+    renderer.goto(str(index))
+    p = Prompter(renderer, max_tabs=3)
+
+    # relative urls can't be prefetched
+    result, _ = p.readline("a::attr(href) --prefetch")
+    assert len(p.tabs) == 1
+    opened = p.prefetch(str(tmp_path / value) for value in result)
+    assert [tab.url for tab in opened] == [str(tmp_path / "a.html"), str(tmp_path / "b.html")]
+    capsys.readouterr()
+    _wait(lambda: all(tab.status != "loading" for tab in p.tabs))
+    assert [tab.status for tab in p.tabs] == ["ready"] * 3
+
+    p.readline("--tab 2")
+    assert p.select("h1::text") == (["a"], {})
+    assert any(c.text == ".a-title" for c in p.completer.get_completions(Document(".a-t"), CompleteEvent()))
+    p.readline("--tab 1")
+    assert p.select("h1::text") == ([], {})
+    # documents of tabs are kept parsed
+    assert p.renderer.cache_stats["selector misses"] == 1
+
+    p.readline("--close-tab 3")
+    p.readline("--tabs")
+    assert capsys.readouterr().err.count("[ready") == 2
+    p.readline(f"--tab {tmp_path / 'c.html'}")
+    _wait(lambda: p.tab.url.endswith("c.html"))
+    assert p.select("h1::text") == (["c"], {})
+    assert len(p.tabs) == 3
+    p.close()
@@ -1,5 +1,9 @@
 import json
-from parselcli.render.browser import PlaywrightRenderer
+
+import pytest
+
+from parselcli.render import browser
+from parselcli.render.browser import EVALUATE_SCRIPT, PlaywrightRenderer, should_block
 
 
 def test_browser_render_basic_setup():
@@ -12,4 +16,84 @@ def test_browser_render_basic_setup():
         url = "http://httpbin.org/html"
         render.goto(url)
         assert render.response.url == url
-        assert render.selector.css("h1::text").get() == "Herman Melville - Moby-Dick"
\ No newline at end of file
+        assert render.selector.css("h1::text").get() == "Herman Melville - Moby-Dick"
+
+
+@pytest.mark.parametrize(
+    "url, resource_type, blocked",
+    [
+        ("http://example.com/", "document", False),
+        ("http://example.com/logo.png", "image", True),
+        ("http://example.com/font.woff2", "font", True),
+        ("http://example.com/app.js", "script", False),
+        ("http://static.example.com/app.js", "script", False),
+        ("http://tracker.net/t.js", "script", True),
+        ("http://example.com/ads/banner.html", "xhr", True),
+        ("http://example.com/api/data", "xhr", False),
+    ],
+)
+def test_should_block(url, resource_type, blocked):
+    assert should_block(url, resource_type, "http://www.example.com/", patterns=["*/ads/*"]) is blocked
+
+
+class FakePage:
+    """page that answers in-page evaluation with prepared values"""
+
+    url = "http://example.com/page"
+    dom_version = 0
+
+    def __init__(self, values):
+        self.values = values
+        self.queries = []
+
+    def evaluate(self, script, args=None):
+        if script != EVALUATE_SCRIPT:
+            return self.dom_version
+        self.queries.append(tuple(args))
+        return self.values
+
+
+@pytest.fixture
+def page_renderer(monkeypatch):
+    monkeypatch.setattr(browser, "PW_SUPPORTED", True)
+
+    def create(values):
+        render = PlaywrightRenderer(evaluate_in_page=True)
+        render.page = FakePage(values)
+        return render
+
+    return create
+
+
+def test_browser_render_evaluate_in_page(page_renderer):
+    render = page_renderer(["<h1>foo</h1>", "bar"])
+    assert render.select("h1") == ["<h1>foo</h1>", "bar"]
+    # parsel's pseudo elements are translated to xpath browsers understand
+    render.select("h1::text")
+    assert render.page.queries[0] == ("h1", False)
+    assert render.page.queries[1][1] is True and render.page.queries[1][0].endswith("/text()")
+    # xpath scalars are converted the same way lxml results are
+    assert page_renderer([True]).select("boolean(//h1)", mode="xpath") == ["1"]
+    assert page_renderer([2]).select("count(//h1)", mode="xpath") == ["2.0"]
+
+
+def test_browser_render_response(page_renderer):
+    render = page_renderer([])
+    render.status = 404
+    assert (render.response.url, render.response.status_code, render.response.content) == (
+        "http://example.com/page",
+        404,
+        b"",
+    )
+
+
+def test_browser_render_sync_tells_mutations(page_renderer):
+    render = page_renderer([])
+    render.sync()
+    loads = render.loads
+    render.page.dom_version += 1
+    render.sync()
+    assert render.loads == loads
+    render.page.url = "http://example.com/other"
+    render.sync()
+    assert render.loads == loads + 1
@@ -0,0 +1,84 @@
+import os
+
+from parselcli.render.cache import BodyStore
+from parselcli.render.http import CachedHttpRenderer, HttpRenderer
+from parselcli.render.memory import create_response
+
+
+def test_body_store(tmp_path):
+    store = BodyStore(tmp_path)
+    assert store.get("http://a.com") is None
+    response = create_response("http://a.com/final", b"<h1>foo</h1>", status_code=201)
+    response.headers["Content-Type"] = "text/html"
+    store.put("http://a.com", response)
+    store.put("http://b.com", create_response("http://b.com", b"<h1>foo</h1>"))
+    cached = store.get("http://a.com")
+    assert cached.from_cache
+    assert (cached.url, cached.status_code, cached.content) == ("http://a.com/final", 201, b"<h1>foo</h1>")
+    assert cached.headers["content-type"] == "text/html"
+    # same bodies are stored once
+    assert len(list((tmp_path / "blobs").rglob("*.body"))) == 1
+    store.put_extra(cached.body_hash, "vocabulary", {"foo": 1})
+    assert store.get_extra(cached.body_hash, "vocabulary") == {"foo": 1}
+    assert store.get_extra(cached.body_hash, "missing") is None
+
+
+def test_body_store_expire(tmp_path):
+    store = BodyStore(tmp_path, expire=0)
+    store.put("http://a.com", create_response("http://a.com", b"foo"))
+    assert store.get("http://a.com") is None
+
+
+def test_body_store_evict(tmp_path):
+    store = BodyStore(tmp_path, max_size=70)
+    store.put("http://a.com", create_response("http://a.com", os.urandom(20)))
+    store.put("http://b.com", create_response("http://b.com", os.urandom(20)))
+    store.get("http://a.com")
+    store.put("http://c.com", create_response("http://c.com", os.urandom(20)))
+    # least recently used response is evicted first
+    assert store.get("http://b.com") is None
+    assert store.get("http://a.com") is not None
+    assert store.get("http://c.com") is not None
+    assert store.size <= 70
+    assert len(list((tmp_path / "blobs").rglob("*.body"))) == 2
+
+
+def test_body_store_evict_shared_body(tmp_path):
+    store = BodyStore(tmp_path, max_size=50)
+    body = os.urandom(20)
+    store.put("http://a.com", create_response("http://a.com", body))
+    store.put("http://b.com", create_response("http://b.com", body))
+    store.put("http://c.com", create_response("http://c.com", os.urandom(20)))
+    # shared body is only freed once both responses referring to it are evicted
+    assert store.get("http://a.com") is None
+    assert store.get("http://b.com") is None
+    assert store.get("http://c.com") is not None
+    assert len(list((tmp_path / "blobs").rglob("*.body"))) == 1
+
+
+def test_cachehttp_render_persists_documents(tmp_path, monkeypatch):
+    fetched = []
+
+    def fetch(self, url, session=None):
+        fetched.append(url)
+        return create_response(url, b"<h1>foo</h1>")
+
+    monkeypatch.setattr(HttpRenderer, "fetch", fetch)
+    with CachedHttpRenderer(str(tmp_path)) as render:
+        render.goto("http://a.com")
+        assert not render.response.from_cache
+        assert render.cached("vocabulary", lambda: {"h1": 1}) == {"h1": 1}
+    with CachedHttpRenderer(str(tmp_path)) as render:
+        render.goto("http://a.com")
+        assert render.response.from_cache
+        assert render.selector.css("h1::text").get() == "foo"
+        assert render.cached("vocabulary", lambda: None) == {"h1": 1}
+    assert fetched == ["http://a.com"]
+
+
+def test_cachehttp_render_skips_errors(tmp_path, monkeypatch):
+    monkeypatch.setattr(HttpRenderer, "fetch", lambda self, url, session=None: create_response(url, b"", 503))
+    with CachedHttpRenderer(str(tmp_path)) as render:
+        render.goto("http://a.com")
+        assert render.response.status_code == 503
+        assert render.store.get("http://a.com") is None
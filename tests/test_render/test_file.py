@@ -0,0 +1,66 @@
+import io
+import sys
+
+import pytest
+
+from parselcli.render import file as file_render
+from parselcli.render.file import FileRenderer, parse_document, sniff_encoding
+
+
+def test_parse_document_in_chunks(monkeypatch):
+    monkeypatch.setattr(file_render, "PARSE_CHUNK_SIZE", 3)
+    body = "<div><h1 class='ąčę'>ąčę title</h1></div>".encode()
+    sel = parse_document(body)
+    assert sel.css("h1::text").get() == "ąčę title"
+    assert sel.css(".ąčę::text").get() == "ąčę title"
+    assert parse_document(b"").css("h1").getall() == []
+    assert parse_document(b"<r><t>x</t></r>", type="xml").xpath("/r/t/text()").get() == "x"
+
+
+def test_file_render(tmp_path):
+    page = tmp_path / "page.html"
+    page.write_text("<h1>foo</h1>")
+    with FileRenderer() as render:
+        render.goto(str(page))
+        assert render.response.url == page.as_uri()
+        assert render.selector.css("h1::text").get() == "foo"
+        assert render.content == "<h1>foo</h1>"
+        assert render.size == 12
+        render.goto(page.as_uri())
+        assert render.selector.css("h1::text").get() == "foo"
+        with pytest.raises(FileNotFoundError):
+            render.goto(str(tmp_path / "missing.html"))
+
+
+def test_file_render_declared_encoding(tmp_path):
+    page = tmp_path / "page.html"
+    page.write_bytes('<meta charset="iso-8859-1"><h1>café</h1>'.encode("latin-1"))
+    xml = tmp_path / "feed.xml"
+    xml.write_bytes('<?xml version="1.0" encoding="windows-1252"?><r>café</r>'.encode("cp1252"))
+    with FileRenderer() as render:
+        render.goto(str(page))
+        assert render.selector.css("h1::text").get() == "café"
+        assert "café" in render.content
+        render.goto(str(xml))
+        assert render.selector.xpath("//r/text()").get() == "café"
+    assert sniff_encoding("<h1>café</h1>".encode()) == "utf-8"
+
+
+def test_file_render_directory(tmp_path):
+    (tmp_path / "b.xml").write_text("<r><t>b</t></r>")
+    (tmp_path / "a.html").write_text("<h1>a</h1>")
+    (tmp_path / "notes.txt").write_text("not a document")
+    with FileRenderer() as render:
+        render.goto(str(tmp_path))
+        assert [path.name for path in render.files] == ["a.html", "b.xml"]
+        assert render.selector.css("h1::text").get() == "a"
+        render.goto(str(render.files[1]))
+        assert render.type == "xml"
+        assert render.selector.xpath("/r/t/text()").get() == "b"
+
+
+def test_file_render_stdin(monkeypatch):
+    monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(b"<h1>stdin</h1>")))
+    with FileRenderer() as render:
+        render.goto("-")
+        assert render.selector.css("h1::text").get() == "stdin"
@@ -1,20 +1,22 @@
 import json
+import threading
+import time
 
-from requests_cache import CachedResponse
-from parselcli.render.http import HttpRenderer, CachedHttpRenderer
+from parselcli.render.http import HttpRenderer, CachedHttpRenderer, FetchPool
 
 
-def test_cachehttp_render_basic_setup():
-    with CachedHttpRenderer("http.cache") as render:
+def test_cachehttp_render_basic_setup(tmp_path):
+    with CachedHttpRenderer(str(tmp_path)) as render:
         url = "http://httpbin.org/headers"
         render.goto(url)
+        render.goto(url)
         assert render.response.url == url
-        assert isinstance(render.response, CachedResponse)
+        assert render.response.from_cache
         assert json.loads(render.content)
 
 
-def test_cachehttp_render_switch_selector():
-    with CachedHttpRenderer("http.cache") as render:
+def test_cachehttp_render_switch_selector(tmp_path):
+    with CachedHttpRenderer(str(tmp_path)) as render:
         # go to random url
         render.goto("http://httpbin.org/headers")
         # then test context switch
@@ -42,3 +44,42 @@ def test_http_render_switch_selector():
         render.goto(url)
         assert render.response.url == url
         assert render.selector.css("h1::text").get() == "Herman Melville - Moby-Dick"
+
+
+def test_fetch_pool_limits_hosts():
+    active, peak = {}, {}
+    lock = threading.Lock()
+
+    class SlowRenderer(HttpRenderer):
+        def fetch(self, url, session=None):
+            host = url.split("/")[2]
+            with lock:
+                active[host] = active.get(host, 0) + 1
+                peak[host] = max(peak.get(host, 0), active[host])
+            time.sleep(0.01)
+            with lock:
+                active[host] -= 1
+            return url
+
+    urls = [f"http://{host}/{i}" for i in range(10) for host in ("a.com", "b.com")]
+    with FetchPool(SlowRenderer(), concurrency=6, per_host=2) as pool:
+        assert [future.result() for _, future in pool.imap(urls)] == urls
+    assert set(peak) == {"a.com", "b.com"}
+    assert all(count <= 2 for count in peak.values())
+
+
+def test_fetch_pool_closes_sessions():
+    closed = []
+
+    class Renderer(HttpRenderer):
+        def create_session(self):
+            session = super().create_session()
+            session.close = lambda: closed.append(session)
+            return session
+
+        def fetch(self, url, session=None):
+            return session
+
+    with FetchPool(Renderer(), concurrency=2) as pool:
+        sessions = {future.result() for _, future in pool.imap(["http://a.com"] * 4)}
+    assert sessions and set(closed) == sessions
@@ -0,0 +1,34 @@
+from parselcli.render.memory import MemoryRenderer
+
+
+def test_memory_render_selector_cache():
+    with MemoryRenderer() as render:
+        render.goto("http://example.com", content="<h1>foo</h1>")
+        sel = render.selector
+        assert render.selector is sel
+        assert render.selector.css("h1::text").get() == "foo"
+        assert render.cache_stats["selector misses"] == 1
+        assert render.cache_stats["selector hits"] == 2
+        # new response should drop cached selector
+        version = render.version
+        render.goto("http://example.com/2", content="<h1>bar</h1>")
+        assert render.version == version + 1
+        assert render.selector is not sel
+        assert render.selector.css("h1::text").get() == "bar"
+        assert render.cache_stats["selector misses"] == 2
+
+
+def test_memory_render_refresh():
+    with MemoryRenderer() as render:
+        render.goto("http://example.com", content="<h1>foo</h1>")
+        sel = render.selector
+        render.refresh()
+        assert render.selector is not sel
+        assert render.selector.css("h1::text").get() == "foo"
+
+
+def test_memory_render_select():
+    with MemoryRenderer() as render:
+        render.goto("http://example.com", content="<h1>foo</h1><h1>bar</h1>")
+        assert render.select("h1::text") == ["foo", "bar"]
+        assert render.select("count(//h1)", mode="xpath") == ["2.0"]
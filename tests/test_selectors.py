@@ -0,0 +1,52 @@
+import pytest
+from parsel import Selector
+
+from parselcli.selectors import SelectorCache, select, translate
+
+HTML = '<div id="a" class="x y"><a href="/1">one</a><a href="/2">two<b>!</b></a></div>'
+XML = '<r xmlns:p="http://p"><p:item>1</p:item><item>2</item></r>'
+
+
+@pytest.mark.parametrize(
+    "query, mode",
+    [
+        ("a::text", "css"),
+        ("a::attr(href)", "css"),
+        ("div.x > a", "css"),
+        ("//a", "xpath"),
+        ("count(//a)", "xpath"),
+        ("boolean(//b)", "xpath"),
+        ("string(//a[2])", "xpath"),
+        ("//a[re:test(@href, '2$')]/text()", "xpath"),
+        ("//div[has-class('y')]/@id", "xpath"),
+    ],
+)
+def test_select_matches_parsel(query, mode):
+    sel = Selector(text=HTML)
+    assert select(sel, query, mode=mode, cache=SelectorCache()) == getattr(sel, mode)(query).getall()
+
+
+def test_select_xml():
+    sel = Selector(text=XML, type="xml")
+    sel.register_namespace("p", "http://p")
+    assert select(sel, "//p:item/text()", mode="xpath") == ["1"]
+    assert select(sel, "item", mode="css") == sel.css("item").getall()
+
+
+def test_selector_cache():
+    cache = SelectorCache(maxsize=2)
+    sel = Selector(text=HTML)
+    select(sel, "a", cache=cache)
+    select(sel, "a", cache=cache)
+    select(sel, "a", mode="xpath", cache=cache)
+    assert cache.stats == {"size": 2, "hits": 1, "misses": 2}
+    select(sel, "b", cache=cache)  # evicts least recently used css "a"
+    select(sel, "a", mode="xpath", cache=cache)
+    select(sel, "a", cache=cache)
+    assert cache.stats == {"size": 2, "hits": 2, "misses": 4}
+
+
+def test_translate_pseudo_elements():
+    sel = Selector(text=HTML)
+    for query in ("a::text", "a::attr(href)"):
+        assert sel.xpath(translate(query)).getall() == sel.css(query).getall()
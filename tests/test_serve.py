@@ -0,0 +1,67 @@
+import http.client
+import json
+import socket
+import threading
+
+from parselcli.render.http import FetchPool, HttpRenderer
+from parselcli.serve import SelectorService, create_server
+
+HTML = '<h1> title </h1><a href="/foo">foo</a>'
+
+
+def test_service_select(tmp_path):
+    page = tmp_path / "page.html"
+    page.write_text(HTML)
+    with FetchPool(HttpRenderer()) as pool:
+        service = SelectorService(pool, max_documents=1, allow_files=True)
+        request = {"url": str(page), "selectors": {"title": "h1::text --first --strip"}}
+        assert service.select(request) == (200, {"url": page.as_uri(), "status": 200, "data": {"title": "title"}})
+        service.select(request)
+        assert service.stats == {"document misses": 1, "document hits": 1}
+
+        status, result = service.select(
+            {"url": "http://example.com/", "body": HTML, "selectors": {"links": "//a/@href --xpath --absolute"}}
+        )
+        assert status == 200
+        assert result["data"] == {"links": ["http://example.com/foo"]}
+        assert service.info()["documents"] == 1
+
+        assert service.select({"body": HTML, "selectors": {"x": "h1 --fetch"}})[0] == 400
+        assert service.select({"selectors": {"x": "h1"}})[0] == 400
+        assert service.select({"url": str(tmp_path / "missing"), "selectors": {"x": "h1"}})[0] == 502
+
+
+def test_service_rejects_local_files(tmp_path):
+    page = tmp_path / "page.html"
+    page.write_text(HTML)
+    with FetchPool(HttpRenderer()) as pool:
+        service = SelectorService(pool)
+        for url in [str(page), page.as_uri(), "ftp://example.com/page.html"]:
+            status, result = service.select({"url": url, "selectors": {"title": "h1::text"}})
+            assert status == 400
+            assert "--allow-files" in result["error"]
+        assert service.stats == {}
+        # submitted body can still use any url for resolving relative urls
+        assert service.select({"url": page.as_uri(), "body": HTML, "selectors": {"x": "h1"}})[0] == 200
+
+
+def test_server_unix_socket(tmp_path):
+    path = str(tmp_path / "parsel.sock")
+    with FetchPool(HttpRenderer()) as pool:
+        server = create_server(SelectorService(pool), socket_path=path)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            connection = http.client.HTTPConnection("localhost")
+            connection.sock = socket.socket(socket.AF_UNIX)
+            connection.sock.connect(path)
+            connection.request("POST", "/select", json.dumps({"body": HTML, "selectors": {"title": "h1::text"}}))
+            response = connection.getresponse()
+            assert response.status == 200
+            assert json.loads(response.read())["data"] == {"title": [" title "]}
+            # connection is kept alive between requests
+            connection.request("GET", "/stats")
+            assert json.loads(connection.getresponse().read())["document_misses"] == 1
+        finally:
+            server.shutdown()
+            server.server_close()
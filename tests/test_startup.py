@@ -0,0 +1,47 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ["prompt_toolkit", "rich", "bs4", "pyperclip", "playwright"]
+# seconds `import parselcli.cli` may take on top of importing its own light dependencies
+STARTUP_BUDGET = 0.1
+
+
+def _run(code: str, env=None) -> dict:
+    output = subprocess.check_output([sys.executable, "-c", code], env={**os.environ, **(env or {})})
+    return json.loads(output.decode().splitlines()[-1])
+
+
+def _best_of(code: str, repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def test_cli_import_is_light():
+    code = "import json, sys; import parselcli.cli; print(json.dumps({'modules': list(sys.modules)}))"
+    result = _run(code)
+    assert not set(HEAVY_MODULES + ["requests"]) & set(result["modules"])
+
+
+def test_compile_run_skips_interactive_dependencies(tmp_path):
+    doc = tmp_path / "doc.html"
+    doc.write_text("<h1>foo</h1>")
+    code = (
+        "import json, sys; from parselcli.cli import cli; "
+        f"cli(['-c', 'h1::text', {str(doc)!r}], standalone_mode=False); "
+        "print(json.dumps({'modules': list(sys.modules)}))"
+    )
+    result = _run(code, env={"XDG_CONFIG_HOME": str(tmp_path), "XDG_CACHE_HOME": str(tmp_path)})
+    assert not set(HEAVY_MODULES) & set(result["modules"])
+
+
+def test_cli_import_within_budget():
+    # relative to interpreter start plus cli's dependencies so the budget holds on slow and fast machines alike
+    baseline = _best_of("import click, loguru, toml")
+    assert _best_of("import parselcli.cli") - baseline < STARTUP_BUDGET